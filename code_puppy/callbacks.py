@@ -1,7 +1,17 @@
 import asyncio
+import inspect
 import logging
-import traceback
-from typing import Any, Callable, Dict, List, Literal, Optional
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    get_args,
+)
 
 PhaseType = Literal[
     "startup",
@@ -18,33 +28,67 @@ PhaseType = Literal[
     "custom_command",
     "custom_command_help",
     "file_permission",
+    "file_permission_bulk",
 ]
 CallbackFunc = Callable[..., Any]
 
-_callbacks: Dict[PhaseType, List[CallbackFunc]] = {
-    "startup": [],
-    "shutdown": [],
-    "invoke_agent": [],
-    "agent_exception": [],
-    "version_check": [],
-    "edit_file": [],
-    "delete_file": [],
-    "run_shell_command": [],
-    "load_model_config": [],
-    "load_prompt": [],
-    "agent_reload": [],
-    "custom_command": [],
-    "custom_command_help": [],
-    "file_permission": [],
-}
+# Phases are addressed by a small integer index fixed at import time, so the
+# hot paths do one dict probe (name -> index) and then plain list indexing.
+_PHASE_NAMES: Tuple[PhaseType, ...] = get_args(PhaseType)
+_PHASE_IDX: Dict[str, int] = {name: index for index, name in enumerate(_PHASE_NAMES)}
+
+_FILE_PERMISSION_IDX: int = _PHASE_IDX["file_permission"]
+
+_callbacks: List[List[CallbackFunc]] = [[] for _ in _PHASE_NAMES]
+
+# Each phase carries a version that is bumped whenever its callback list changes,
+# so dispatch can reuse an immutable tuple snapshot instead of copying the list.
+# Alongside the snapshot we keep, per callback, whether it is an ``async def``
+# function; any other callable's result is checked for a coroutine on every call.
+_versions: List[int] = [0] * len(_PHASE_NAMES)
+_snapshots: List[Optional[Tuple[int, Tuple[CallbackFunc, ...], List[bool]]]] = [
+    None
+] * len(_PHASE_NAMES)
+
+# Bit ``index`` is set while that phase has at least one callback. Most phases
+# are empty in a typical run, so triggers bail out on a single integer test.
+_nonempty_mask: int = 0
+
+# Async phases whose callbacks must finish one after another, in registration
+# order. Every other async phase awaits its coroutine callbacks concurrently.
+_SEQUENTIAL_PHASES: FrozenSet[PhaseType] = frozenset({"shutdown"})
+
+# Permission phases fail closed: a coroutine returned from a sync trigger that
+# cannot be run there counts as a denial rather than a silent "no objection".
+_PERMISSION_MASK: int = (1 << _PHASE_IDX["file_permission"]) | (
+    1 << _PHASE_IDX["file_permission_bulk"]
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _mark_changed(index: int) -> None:
+    """Invalidate the snapshot for a phase and refresh its non-empty bit."""
+    global _nonempty_mask
+    _versions[index] += 1
+    if _callbacks[index]:
+        _nonempty_mask |= 1 << index
+    else:
+        _nonempty_mask &= ~(1 << index)
+
+
 def register_callback(phase: PhaseType, func: CallbackFunc) -> None:
-    if phase not in _callbacks:
+    """Register a callback for a phase.
+
+    Coroutine callbacks of async phases are awaited concurrently via
+    ``asyncio.gather``; results keep registration order and a failing callback
+    yields ``None`` without affecting the others. Phases listed in
+    ``_SEQUENTIAL_PHASES`` (e.g. ``shutdown``) await each callback in turn.
+    """
+    index = _PHASE_IDX.get(phase)
+    if index is None:
         raise ValueError(
-            f"Unsupported phase: {phase}. Supported phases: {list(_callbacks.keys())}"
+            f"Unsupported phase: {phase}. Supported phases: {list(_PHASE_NAMES)}"
         )
 
     if not callable(func):
@@ -52,24 +96,29 @@ def register_callback(phase: PhaseType, func: CallbackFunc) -> None:
 
     # Prevent duplicate registration of the same callback function
     # This can happen if plugins are accidentally loaded multiple times
-    if func in _callbacks[phase]:
+    if func in _callbacks[index]:
         logger.debug(
-            f"Callback {func.__name__} already registered for phase '{phase}', skipping"
+            "Callback %s already registered for phase '%s', skipping",
+            func.__name__,
+            phase,
         )
         return
 
-    _callbacks[phase].append(func)
-    logger.debug(f"Registered async callback {func.__name__} for phase '{phase}'")
+    _callbacks[index].append(func)
+    _mark_changed(index)
+    logger.debug("Registered async callback %s for phase '%s'", func.__name__, phase)
 
 
 def unregister_callback(phase: PhaseType, func: CallbackFunc) -> bool:
-    if phase not in _callbacks:
+    index = _PHASE_IDX.get(phase)
+    if index is None:
         return False
 
     try:
-        _callbacks[phase].remove(func)
+        _callbacks[index].remove(func)
+        _mark_changed(index)
         logger.debug(
-            f"Unregistered async callback {func.__name__} from phase '{phase}'"
+            "Unregistered async callback %s from phase '%s'", func.__name__, phase
         )
         return True
     except ValueError:
@@ -78,90 +127,260 @@ def unregister_callback(phase: PhaseType, func: CallbackFunc) -> bool:
 
 def clear_callbacks(phase: Optional[PhaseType] = None) -> None:
     if phase is None:
-        for p in _callbacks:
-            _callbacks[p].clear()
+        for index, callbacks in enumerate(_callbacks):
+            callbacks.clear()
+            _mark_changed(index)
         logger.debug("Cleared all async callbacks")
     else:
-        if phase in _callbacks:
-            _callbacks[phase].clear()
-            logger.debug(f"Cleared async callbacks for phase '{phase}'")
+        phase_index = _PHASE_IDX.get(phase)
+        if phase_index is not None:
+            _callbacks[phase_index].clear()
+            _mark_changed(phase_index)
+            logger.debug("Cleared async callbacks for phase '%s'", phase)
+
+
+def _is_coroutine_callback(func: CallbackFunc) -> bool:
+    """Return True for ``async def`` callbacks (directly or behind a wrapper).
+
+    False only means "not known to be async": a plain callable may still
+    return a coroutine on some calls, so its results are checked every time.
+    """
+    return inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(
+        getattr(func, "__wrapped__", None)
+    )
+
+
+def _dispatch_plan(index: int) -> Tuple[Tuple[CallbackFunc, ...], List[bool]]:
+    """Return a phase's callbacks and coroutine flags, rebuilt only after changes.
+
+    ``_trigger_callbacks`` and ``_trigger_callbacks_sync``, the hottest paths,
+    inline the cached check and only call this after the phase changed.
+    """
+    version = _versions[index]
+    cached = _snapshots[index]
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+    snapshot = tuple(_callbacks[index])
+    flags = [_is_coroutine_callback(callback) for callback in snapshot]
+    _snapshots[index] = (version, snapshot, flags)
+    return snapshot, flags
 
 
 def get_callbacks(phase: PhaseType) -> List[CallbackFunc]:
-    return _callbacks.get(phase, []).copy()
+    index = _PHASE_IDX.get(phase)
+    if index is None:
+        return []
+    return list(_dispatch_plan(index)[0])
 
 
 def count_callbacks(phase: Optional[PhaseType] = None) -> int:
     if phase is None:
-        return sum(len(callbacks) for callbacks in _callbacks.values())
-    return len(_callbacks.get(phase, []))
+        return sum(len(callbacks) for callbacks in _callbacks)
+    index = _PHASE_IDX.get(phase)
+    return 0 if index is None else len(_callbacks[index])
+
+
+def has_listeners(phase: PhaseType) -> bool:
+    """Return whether any callback is registered for ``phase`` (O(1))."""
+    index = _PHASE_IDX.get(phase)
+    return index is not None and bool((_nonempty_mask >> index) & 1)
+
+
+def _log_callback_error(
+    phase: PhaseType, callback: CallbackFunc, exc: BaseException
+) -> None:
+    """Log a failed callback with its traceback; dispatch carries on without it."""
+    logger.error(
+        "Callback %s failed in phase '%s': %s",
+        getattr(callback, "__name__", repr(callback)),
+        phase,
+        exc,
+        exc_info=exc,
+    )
 
 
-def _trigger_callbacks_sync(phase: PhaseType, *args, **kwargs) -> List[Any]:
-    callbacks = get_callbacks(phase)
-    if not callbacks:
-        logger.debug(f"No callbacks registered for phase '{phase}'")
+def _run_coroutine_sync(callback: CallbackFunc, coro: Any, fallback: Any = None) -> Any:
+    """Run a coroutine returned by a callback from a sync trigger.
+
+    Inside a running event loop the coroutine cannot be run here; it is
+    closed and ``fallback`` is returned instead.
+    """
+    # Try to get the running event loop
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # No running loop - we're in a sync/worker thread context
+        # Use asyncio.run() which is safe here since we're in an isolated thread
+        return asyncio.run(coro)
+    # We're in an async context already - this shouldn't happen for sync triggers
+    # but if it does, we can't use run_until_complete
+    coro.close()
+    logger.warning(
+        "Async callback %s called from async context in sync trigger",
+        callback.__name__,
+    )
+    return fallback
+
+
+def _trigger_callbacks_sync_noargs(phase: PhaseType) -> List[Any]:
+    """Dispatch a sync phase whose callbacks take no arguments.
+
+    Same semantics as ``_trigger_callbacks_sync`` without packing and
+    re-expanding empty ``*args``/``**kwargs`` for every callback.
+    """
+    phase_index = _PHASE_IDX[phase]
+    if not (_nonempty_mask >> phase_index) & 1:
         return []
 
-    results = []
-    for callback in callbacks:
+    results: List[Any] = []
+    for callback in _dispatch_plan(phase_index)[0]:
         try:
-            result = callback(*args, **kwargs)
-            # Handle async callbacks - if we get a coroutine, run it
+            result = callback()
             if asyncio.iscoroutine(result):
-                # Try to get the running event loop
-                try:
-                    asyncio.get_running_loop()
-                    # We're in an async context already - this shouldn't happen for sync triggers
-                    # but if it does, we can't use run_until_complete
-                    logger.warning(
-                        f"Async callback {callback.__name__} called from async context in sync trigger"
-                    )
-                    results.append(None)
-                    continue
-                except RuntimeError:
-                    # No running loop - we're in a sync/worker thread context
-                    # Use asyncio.run() which is safe here since we're in an isolated thread
-                    result = asyncio.run(result)
+                result = _run_coroutine_sync(callback, result)
             results.append(result)
-            logger.debug(f"Successfully executed callback {callback.__name__}")
         except Exception as e:
-            logger.error(
-                f"Callback {callback.__name__} failed in phase '{phase}': {e}\n"
-                f"{traceback.format_exc()}"
-            )
+            _log_callback_error(phase, callback, e)
             results.append(None)
 
     return results
 
 
-async def _trigger_callbacks(phase: PhaseType, *args, **kwargs) -> List[Any]:
-    callbacks = get_callbacks(phase)
-
-    if not callbacks:
-        logger.debug(f"No callbacks registered for phase '{phase}'")
+def _trigger_callbacks_sync(phase: PhaseType, *args: Any, **kwargs: Any) -> List[Any]:
+    phase_index = _PHASE_IDX.get(phase, -1)
+    if phase_index < 0 or not (_nonempty_mask >> phase_index) & 1:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("No callbacks registered for phase '%s'", phase)
         return []
 
-    logger.debug(f"Triggering {len(callbacks)} async callbacks for phase '{phase}'")
+    # Inlined snapshot lookup; _dispatch_plan only runs after the phase changed
+    cached = _snapshots[phase_index]
+    if cached is not None and cached[0] == _versions[phase_index]:
+        callbacks = cached[1]
+    else:
+        callbacks = _dispatch_plan(phase_index)[0]
+    debug: bool = logger.isEnabledFor(logging.DEBUG)
+    unrun: Optional[bool] = False if (_PERMISSION_MASK >> phase_index) & 1 else None
 
-    results = []
+    results: List[Any] = []
     for callback in callbacks:
         try:
             result = callback(*args, **kwargs)
+            # Handle async callbacks - if we get a coroutine, run it
             if asyncio.iscoroutine(result):
-                result = await result
+                result = _run_coroutine_sync(callback, result, unrun)
             results.append(result)
-            logger.debug(f"Successfully executed async callback {callback.__name__}")
+            if debug:
+                logger.debug("Successfully executed callback %s", callback.__name__)
         except Exception as e:
-            logger.error(
-                f"Async callback {callback.__name__} failed in phase '{phase}': {e}\n"
-                f"{traceback.format_exc()}"
-            )
+            _log_callback_error(phase, callback, e)
             results.append(None)
 
     return results
 
 
+def _trigger_callbacks_sync_first(phase: PhaseType, *args: Any, **kwargs: Any) -> Any:
+    """Dispatch a sync-only phase and return its first non-None result, or None.
+
+    Every callback still runs in registration order (failures are logged and
+    skipped); callers that only want one answer avoid building a result list.
+    """
+    phase_index = _PHASE_IDX[phase]
+    if not (_nonempty_mask >> phase_index) & 1:
+        return None
+
+    first: Any = None
+    for callback in _dispatch_plan(phase_index)[0]:
+        try:
+            result = callback(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = _run_coroutine_sync(callback, result)
+        except Exception as e:
+            _log_callback_error(phase, callback, e)
+            continue
+        if first is None:
+            first = result
+    return first
+
+
+async def _trigger_callbacks(phase: PhaseType, *args: Any, **kwargs: Any) -> List[Any]:
+    phase_index = _PHASE_IDX.get(phase, -1)
+    if phase_index < 0 or not (_nonempty_mask >> phase_index) & 1:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("No callbacks registered for phase '%s'", phase)
+        return []
+
+    # Inlined snapshot lookup; _dispatch_plan only runs after the phase changed
+    cached = _snapshots[phase_index]
+    if cached is not None and cached[0] == _versions[phase_index]:
+        callbacks, returns_coroutine = cached[1], cached[2]
+    else:
+        callbacks, returns_coroutine = _dispatch_plan(phase_index)
+    debug: bool = logger.isEnabledFor(logging.DEBUG)
+
+    if debug:
+        logger.debug(
+            "Triggering %d async callbacks for phase '%s'", len(callbacks), phase
+        )
+
+    if phase in _SEQUENTIAL_PHASES:
+        results: List[Any] = []
+        for index, callback in enumerate(callbacks):
+            try:
+                result = callback(*args, **kwargs)
+                if returns_coroutine[index] or asyncio.iscoroutine(result):
+                    result = await result
+                results.append(result)
+                if debug:
+                    logger.debug(
+                        "Successfully executed async callback %s", callback.__name__
+                    )
+            except Exception as e:
+                _log_callback_error(phase, callback, e)
+                results.append(None)
+        return results
+
+    # Call every callback first, then await the coroutines together so I/O-bound
+    # plugins overlap instead of adding up.
+    results = [None] * len(callbacks)
+    pending: List[Tuple[int, CallbackFunc, Any]] = []
+    for index, callback in enumerate(callbacks):
+        try:
+            result = callback(*args, **kwargs)
+        except Exception as e:
+            _log_callback_error(phase, callback, e)
+            continue
+        # async def callbacks always return a coroutine; anything else may
+        # return one on some calls only, so its result is checked every time.
+        if returns_coroutine[index] or asyncio.iscoroutine(result):
+            pending.append((index, callback, result))
+        else:
+            results[index] = result
+            if debug:
+                logger.debug(
+                    "Successfully executed async callback %s", callback.__name__
+                )
+
+    if pending:
+        outcomes = await asyncio.gather(
+            *(coro for _, _, coro in pending), return_exceptions=True
+        )
+        for (index, callback, _), outcome in zip(pending, outcomes):
+            if isinstance(outcome, Exception):
+                _log_callback_error(phase, callback, outcome)
+            elif isinstance(outcome, BaseException):
+                # Cancellation and interpreter exits must still propagate
+                raise outcome
+            else:
+                results[index] = outcome
+                if debug:
+                    logger.debug(
+                        "Successfully executed async callback %s", callback.__name__
+                    )
+
+    return results
+
+
 async def on_startup() -> List[Any]:
     return await _trigger_callbacks("startup")
 
@@ -170,40 +389,64 @@ async def on_shutdown() -> List[Any]:
     return await _trigger_callbacks("shutdown")
 
 
-async def on_invoke_agent(*args, **kwargs) -> List[Any]:
+async def on_invoke_agent(*args: Any, **kwargs: Any) -> List[Any]:
     return await _trigger_callbacks("invoke_agent", *args, **kwargs)
 
 
-async def on_agent_exception(exception: Exception, *args, **kwargs) -> List[Any]:
+async def on_agent_exception(
+    exception: Exception, *args: Any, **kwargs: Any
+) -> List[Any]:
     return await _trigger_callbacks("agent_exception", exception, *args, **kwargs)
 
 
-async def on_version_check(*args, **kwargs) -> List[Any]:
+async def on_version_check(*args: Any, **kwargs: Any) -> List[Any]:
     return await _trigger_callbacks("version_check", *args, **kwargs)
 
 
-def on_load_model_config(*args, **kwargs) -> List[Any]:
+def on_load_model_config(*args: Any, **kwargs: Any) -> List[Any]:
     return _trigger_callbacks_sync("load_model_config", *args, **kwargs)
 
 
-def on_edit_file(*args, **kwargs) -> Any:
+def on_edit_file(*args: Any, **kwargs: Any) -> Any:
     return _trigger_callbacks_sync("edit_file", *args, **kwargs)
 
 
-def on_delete_file(*args, **kwargs) -> Any:
+def on_delete_file(*args: Any, **kwargs: Any) -> Any:
     return _trigger_callbacks_sync("delete_file", *args, **kwargs)
 
 
-async def on_run_shell_command(*args, **kwargs) -> Any:
+def on_edit_file_first(context: Any, result: Dict[str, Any], payload: Any) -> Any:
+    """Like on_edit_file, but return only the first non-None result (or None).
+
+    Args:
+        context: The tool's run context
+        result: The edit_file tool result, without its diff
+        payload: The edit payload that produced the result
+    """
+    return _trigger_callbacks_sync_first("edit_file", context, result, payload)
+
+
+def on_delete_file_first(context: Any, result: Dict[str, Any], file_path: str) -> Any:
+    """Like on_delete_file, but return only the first non-None result (or None).
+
+    Args:
+        context: The tool's run context
+        result: The delete_file tool result, without its diff
+        file_path: The path that was asked to be deleted
+    """
+    return _trigger_callbacks_sync_first("delete_file", context, result, file_path)
+
+
+async def on_run_shell_command(*args: Any, **kwargs: Any) -> Any:
     return await _trigger_callbacks("run_shell_command", *args, **kwargs)
 
 
-def on_agent_reload(*args, **kwargs) -> Any:
+def on_agent_reload(*args: Any, **kwargs: Any) -> Any:
     return _trigger_callbacks_sync("agent_reload", *args, **kwargs)
 
 
-def on_load_prompt():
-    return _trigger_callbacks_sync("load_prompt")
+def on_load_prompt() -> List[Any]:
+    return _trigger_callbacks_sync_noargs("load_prompt")
 
 
 def on_custom_command_help() -> List[Any]:
@@ -212,7 +455,7 @@ def on_custom_command_help() -> List[Any]:
     Each callback should return a list of tuples [(name, description), ...]
     or a single tuple, or None. We'll flatten and sanitize results.
     """
-    return _trigger_callbacks_sync("custom_command_help")
+    return _trigger_callbacks_sync_noargs("custom_command_help")
 
 
 def on_custom_command(command: str, name: str) -> List[Any]:
@@ -259,6 +502,10 @@ def on_file_permission(
         List of boolean results from permission handlers.
         Returns True if permission should be granted, False if denied.
     """
+    # No permission handler loaded: skip argument shuffling and dispatch entirely
+    if not (_nonempty_mask >> _FILE_PERMISSION_IDX) & 1:
+        return []
+
     # For backward compatibility, if operation_data is provided, prefer it over preview
     if operation_data is not None:
         preview = None
@@ -271,3 +518,33 @@ def on_file_permission(
         message_group,
         operation_data,
     )
+
+
+def on_file_permission_bulk(
+    context: Any,
+    operations: List[Tuple[str, str, Any]],
+    message_group: str | None = None,
+) -> List[Any]:
+    """Trigger bulk file permission callbacks for a batch of file operations.
+
+    Lets a permission handler preview and ask about several operations at
+    once. Each operation is a ``(file_path, operation, operation_data)`` tuple
+    shaped like the arguments of ``on_file_permission``, and each targets a
+    different file. A handler returns a list with one
+    ``file_modifications.PermissionAnswer`` per operation, or None for those
+    it leaves to ``on_file_permission``; it may also return None for all.
+    A denial here is final. Approved operations are still passed to
+    ``on_file_permission``, so every permission handler gets its say, with the
+    answer in ``operation_data["bulk_answer"]`` for the handler that gave it.
+
+    Args:
+        context: The operation context
+        operations: The batch of (file_path, operation, operation_data) tuples
+        message_group: Optional message group
+
+    Returns:
+        List of per-operation answer lists (or None) from bulk handlers.
+    """
+    return _trigger_callbacks_sync(
+        "file_permission_bulk", context, operations, message_group
+    )
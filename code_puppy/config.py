@@ -3,7 +3,7 @@ import datetime
 import json
 import os
 import pathlib
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 
 from code_puppy.session_storage import save_session
 
@@ -220,10 +220,21 @@ def get_config_keys():
     return sorted(keys)
 
 
+# Bumped by set_config_value() so callers caching values derived from puppy.cfg
+# notice updates that leave the file's mtime and size unchanged
+_config_generation = 0
+
+
+def get_config_generation() -> int:
+    """Return a counter that changes whenever set_config_value() writes puppy.cfg."""
+    return _config_generation
+
+
 def set_config_value(key: str, value: str):
     """
     Sets a config value in the persistent config file.
     """
+    global _config_generation
     config = configparser.ConfigParser()
     config.read(CONFIG_FILE)
     if DEFAULT_SECTION not in config:
@@ -231,6 +242,7 @@ def set_config_value(key: str, value: str):
     config[DEFAULT_SECTION][key] = value
     with open(CONFIG_FILE, "w") as f:
         config.write(f)
+    _config_generation += 1
 
 
 # --- MODEL STICKY EXTENSION STARTS HERE ---
@@ -900,15 +912,43 @@ def get_yolo_mode():
     Defaults to True if not set.
     Allowed values for ON: 1, '1', 'true', 'yes', 'on' (all case-insensitive for value).
     """
-    true_vals = {"1", "true", "yes", "on"}
     cfg_val = get_value("yolo_mode")
     if cfg_val is not None:
-        if str(cfg_val).strip().lower() in true_vals:
-            return True
-        return False
+        return str(cfg_val).strip().lower() in ("1", "true", "yes", "on")
     return True
 
 
+# Config-file state (generation, mtime_ns, size) and the flags read at that state
+_config_flag_cache: Tuple[Optional[Tuple[int, int, int]], Dict[str, bool]] = (None, {})
+
+
+def _cached_config_flag(name: str, read: Callable[[], bool]) -> bool:
+    """Return ``read()``, re-parsing puppy.cfg only when the file changes.
+
+    Flags consulted on every file operation cost one stat() on the common path,
+    while edits (e.g. ``/set yolo_mode``) are still picked up, even when they
+    land within the same mtime tick thanks to the config generation.
+    """
+    global _config_flag_cache
+    try:
+        st = os.stat(CONFIG_FILE)
+    except OSError:
+        return read()
+    key = (_config_generation, st.st_mtime_ns, st.st_size)
+    if _config_flag_cache[0] != key:
+        _config_flag_cache = (key, {})
+    flags = _config_flag_cache[1]
+    value = flags.get(name)
+    if value is None:
+        value = flags[name] = read()
+    return value
+
+
+def get_yolo_mode_cached() -> bool:
+    """get_yolo_mode(), cached until puppy.cfg changes."""
+    return _cached_config_flag("yolo_mode", get_yolo_mode)
+
+
 def get_safety_permission_level():
     """
     Checks puppy.cfg for 'safety_permission_level' (case-insensitive in value only).
@@ -1407,6 +1447,36 @@ def set_suppress_informational_messages(enabled: bool):
     set_config_value("suppress_informational_messages", "true" if enabled else "false")
 
 
+def get_suppress_edit_diffs() -> bool:
+    """
+    Checks puppy.cfg for 'suppress_edit_diffs' (case-insensitive in value only).
+    Defaults to False if not set.
+    Allowed values for ON: 1, '1', 'true', 'yes', 'on' (all case-insensitive for value).
+    When enabled together with yolo_mode, file edits skip building and showing diffs.
+    """
+    true_vals = {"1", "true", "yes", "on"}
+    cfg_val = get_value("suppress_edit_diffs")
+    if cfg_val is not None:
+        if str(cfg_val).strip().lower() in true_vals:
+            return True
+        return False
+    return False
+
+
+def get_suppress_edit_diffs_cached() -> bool:
+    """get_suppress_edit_diffs(), cached until puppy.cfg changes."""
+    return _cached_config_flag("suppress_edit_diffs", get_suppress_edit_diffs)
+
+
+def set_suppress_edit_diffs(enabled: bool):
+    """Sets the suppress_edit_diffs configuration value.
+
+    Args:
+        enabled: Whether to skip diffs for file edits in yolo mode
+    """
+    set_config_value("suppress_edit_diffs", "true" if enabled else "false")
+
+
 # API Key management functions
 def get_api_key(key_name: str) -> str:
     """Get an API key from puppy.cfg.
@@ -17,8 +17,9 @@ from rich.rule import Rule
 
 # Note: Syntax import removed - file content not displayed, only header
 from rich.table import Table
+from rich.text import Text
 
-from code_puppy.tools.common import format_diff_with_colors
+from code_puppy.tools.common import iter_diff_with_colors
 
 from .bus import MessageBus
 from .commands import (
@@ -50,7 +51,7 @@ from .messages import (
     VersionCheckMessage,
 )
 
-# Note: Text and Tree were removed - no longer used in this implementation
+# Note: Tree was removed - no longer used in this implementation
 
 
 # =============================================================================
@@ -470,16 +471,17 @@ class RichConsoleRenderer:
         op_color = op_colors.get(msg.operation, "white")
 
         # Header on single line
-        self._console.print(
+        header = Text.from_markup(
             f"\n[bold white on blue] EDIT FILE [/bold white on blue] "
             f"{icon} [{op_color}]{msg.operation.upper()}[/{op_color}] "
             f"[bold cyan]{msg.path}[/bold cyan]"
         )
 
         if not msg.diff_lines:
+            self._console.print(header)
             return
 
-        # Reconstruct unified diff text from diff_lines for format_diff_with_colors
+        # Reconstruct unified diff text from diff_lines for iter_diff_with_colors
         diff_text_lines = []
         for line in msg.diff_lines:
             if line.type == "add":
@@ -496,9 +498,13 @@ class RichConsoleRenderer:
 
         diff_text = "\n".join(diff_text_lines)
 
-        # Use the beautiful syntax-highlighted diff formatter
-        formatted_diff = format_diff_with_colors(diff_text)
-        self._console.print(formatted_diff)
+        # Use the beautiful syntax-highlighted diff formatter, a chunk at a time;
+        # the header goes out with the first chunk, so a small diff is one print
+        for chunk in iter_diff_with_colors(diff_text):
+            if header is not None:
+                chunk = Text.assemble(header, "\n", chunk)
+                header = None
+            self._console.print(chunk)
 
     # =========================================================================
     # Shell Output
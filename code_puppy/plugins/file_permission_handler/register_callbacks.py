@@ -4,19 +4,27 @@ This plugin handles user permission prompts for file operations,
 providing a consistent and extensible permission system.
 """
 
-import difflib
 import os
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 from rich.text import Text as RichText
 
 from code_puppy.callbacks import register_callback
-from code_puppy.config import get_diff_context_lines, get_yolo_mode
+from code_puppy.config import (
+    get_suppress_edit_diffs_cached,
+    get_yolo_mode,
+    get_yolo_mode_cached,
+)
 from code_puppy.messaging import emit_warning
-from code_puppy.tools.common import (
-    _find_best_window,
-    get_user_approval,
+from code_puppy.tools.common import get_user_approval
+from code_puppy.tools.file_modifications import (
+    BULK_ANSWER_KEY,
+    ComputedEdit,
+    PermissionAnswer,
+    _compute_edit,
+    _stat_or_none,
 )
 
 # Lock for preventing multiple simultaneous permission prompts
@@ -25,6 +33,9 @@ _FILE_CONFIRMATION_LOCK = threading.Lock()
 # Thread-local storage for user feedback from permission prompts
 _thread_local = threading.local()
 
+# Previews of a bulk request are computed by at most this many threads
+_BULK_PREVIEW_WORKERS = 8
+
 
 def get_last_user_feedback() -> str | None:
     """Get the last user feedback from a permission prompt in this thread.
@@ -68,155 +79,50 @@ def clear_diff_shown_flag() -> None:
 # Arrow selector and approval UI now handled by common.get_user_approval()
 
 
-def _preview_delete_snippet(file_path: str, snippet: str) -> str | None:
-    """Generate a preview diff for deleting a snippet without modifying the file."""
-    try:
-        file_path = os.path.abspath(file_path)
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
-            return None
-
-        with open(file_path, "r", encoding="utf-8", errors="surrogateescape") as f:
-            original = f.read()
-
-        # Sanitize any surrogate characters
-        try:
-            original = original.encode("utf-8", errors="surrogatepass").decode(
-                "utf-8", errors="replace"
-            )
-        except (UnicodeEncodeError, UnicodeDecodeError):
-            pass
-
-        if snippet not in original:
-            return None
-
-        modified = original.replace(snippet, "")
-        diff_text = "".join(
-            difflib.unified_diff(
-                original.splitlines(keepends=True),
-                modified.splitlines(keepends=True),
-                fromfile=f"a/{os.path.basename(file_path)}",
-                tofile=f"b/{os.path.basename(file_path)}",
-                n=get_diff_context_lines(),
-            )
-        )
-        return diff_text
-    except Exception:
-        return None
+def _file_signature(file_path: str) -> tuple[int, int] | None:
+    """Return (mtime_ns, size) for a path, or None if it cannot be stat'ed."""
+    st = _stat_or_none(file_path)
+    return None if st is None else (st.st_mtime_ns, st.st_size)
 
 
-def _preview_write_to_file(
-    file_path: str, content: str, overwrite: bool = False
-) -> str | None:
-    """Generate a preview diff for writing to a file without modifying it."""
-    try:
-        file_path = os.path.abspath(file_path)
-        exists = os.path.exists(file_path)
-
-        if exists and not overwrite:
-            return None
-
-        diff_lines = difflib.unified_diff(
-            [] if not exists else [""],
-            content.splitlines(keepends=True),
-            fromfile="/dev/null" if not exists else f"a/{os.path.basename(file_path)}",
-            tofile=f"b/{os.path.basename(file_path)}",
-            n=get_diff_context_lines(),
-        )
-        return "".join(diff_lines)
-    except Exception:
-        return None
+def _remember_preview(
+    file_path: str, operation_data: Any, preview: ComputedEdit | None
+) -> None:
+    """Keep the preview for this thread so the tool can apply it without re-reading."""
+    _thread_local.last_preview = (
+        (os.path.abspath(file_path), operation_data, preview)
+        if preview is not None
+        else None
+    )
 
 
-def _preview_replace_in_file(
-    file_path: str, replacements: list[dict[str, str]]
-) -> str | None:
-    """Generate a preview diff for replacing text in a file without modifying the file."""
-    try:
-        file_path = os.path.abspath(file_path)
-
-        with open(file_path, "r", encoding="utf-8", errors="surrogateescape") as f:
-            original = f.read()
-
-        # Sanitize any surrogate characters
-        try:
-            original = original.encode("utf-8", errors="surrogatepass").decode(
-                "utf-8", errors="replace"
-            )
-        except (UnicodeEncodeError, UnicodeDecodeError):
-            pass
-
-        modified = original
-        for rep in replacements:
-            old_snippet = rep.get("old_str", "")
-            new_snippet = rep.get("new_str", "")
-
-            if old_snippet and old_snippet in modified:
-                modified = modified.replace(old_snippet, new_snippet)
-                continue
-
-            # Use the same logic as file_modifications for fuzzy matching
-            orig_lines = modified.splitlines()
-            loc, score = _find_best_window(orig_lines, old_snippet)
-
-            if score < 0.95 or loc is None:
-                return None
-
-            start, end = loc
-            modified = (
-                "\n".join(orig_lines[:start])
-                + "\n"
-                + new_snippet.rstrip("\n")
-                + "\n"
-                + "\n".join(orig_lines[end:])
-            )
-
-        if modified == original:
-            return None
-
-        diff_text = "".join(
-            difflib.unified_diff(
-                original.splitlines(keepends=True),
-                modified.splitlines(keepends=True),
-                fromfile=f"a/{os.path.basename(file_path)}",
-                tofile=f"b/{os.path.basename(file_path)}",
-                n=get_diff_context_lines(),
-            )
-        )
-        return diff_text
-    except Exception:
+def take_prepared_edit(file_path: str, operation_data: Any) -> ComputedEdit | None:
+    """Return and forget the preview computed for this exact operation.
+
+    Only a preview generated from the same ``operation_data`` object, for the
+    same path, whose file is unchanged since it was read, is returned.
+    """
+    stored = getattr(_thread_local, "last_preview", None)
+    _thread_local.last_preview = None
+    if stored is None:
         return None
+    path, data, preview = stored
+    if data is not operation_data or path != os.path.abspath(file_path):
+        return None
+    if _file_signature(path) != preview.signature:
+        return None
+    return preview
 
 
-def _preview_delete_file(file_path: str) -> str | None:
-    """Generate a preview diff for deleting a file without modifying it."""
+def _preview(op: str, file_path: str, **kwargs: Any) -> ComputedEdit | None:
+    """Compute an edit without applying it; None when there is nothing to show."""
+    # Without a prompt to show it in, the diff is only wanted for edit output
+    build_diff = not (get_yolo_mode_cached() and get_suppress_edit_diffs_cached())
     try:
-        file_path = os.path.abspath(file_path)
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
-            return None
-
-        with open(file_path, "r", encoding="utf-8", errors="surrogateescape") as f:
-            original = f.read()
-
-        # Sanitize any surrogate characters
-        try:
-            original = original.encode("utf-8", errors="surrogatepass").decode(
-                "utf-8", errors="replace"
-            )
-        except (UnicodeEncodeError, UnicodeDecodeError):
-            pass
-
-        diff_text = "".join(
-            difflib.unified_diff(
-                original.splitlines(keepends=True),
-                [],
-                fromfile=f"a/{os.path.basename(file_path)}",
-                tofile=f"b/{os.path.basename(file_path)}",
-                n=get_diff_context_lines(),
-            )
-        )
-        return diff_text
+        edit, _ = _compute_edit(op, file_path, build_diff=build_diff, **kwargs)  # type: ignore[arg-type]
     except Exception:
         return None
+    return edit
 
 
 def prompt_for_file_permission(
@@ -240,15 +146,15 @@ def prompt_for_file_permission(
         - confirmed: True if permission is granted, False otherwise
         - user_feedback: Optional feedback message from user to send back to the model
     """
-    yolo_mode = get_yolo_mode()
-
     # Skip confirmation only if in yolo mode (removed TTY check for better compatibility)
-    if yolo_mode:
+    if get_yolo_mode_cached():
         return True, None
 
-    # Try to acquire the lock to prevent multiple simultaneous prompts
-    confirmation_lock_acquired = _FILE_CONFIRMATION_LOCK.acquire(blocking=False)
-    if not confirmation_lock_acquired:
+    # Only one prompt at a time; check locked() first so a busy prompt is
+    # reported without attempting the acquire at all
+    if _FILE_CONFIRMATION_LOCK.locked() or not _FILE_CONFIRMATION_LOCK.acquire(
+        blocking=False
+    ):
         emit_warning(
             "Another file operation is currently awaiting confirmation",
             message_group=message_group,
@@ -275,8 +181,7 @@ def prompt_for_file_permission(
         return confirmed, user_feedback
 
     finally:
-        if confirmation_lock_acquired:
-            _FILE_CONFIRMATION_LOCK.release()
+        _FILE_CONFIRMATION_LOCK.release()
 
 
 def handle_edit_file_permission(
@@ -303,15 +208,17 @@ def handle_edit_file_permission(
     if operation_type == "write":
         content = operation_data.get("content", "")
         overwrite = operation_data.get("overwrite", False)
-        preview = _preview_write_to_file(file_path, content, overwrite)
+        preview = _diff_of(
+            _preview("write", file_path, content=content, overwrite=overwrite)
+        )
         operation_desc = "write to"
     elif operation_type == "replace":
         replacements = operation_data.get("replacements", [])
-        preview = _preview_replace_in_file(file_path, replacements)
+        preview = _diff_of(_preview("replace", file_path, replacements=replacements))
         operation_desc = "replace text in"
     elif operation_type == "delete_snippet":
         snippet = operation_data.get("delete_snippet", "")
-        preview = _preview_delete_snippet(file_path, snippet)
+        preview = _diff_of(_preview("delete_snippet", file_path, snippet=snippet))
         operation_desc = "delete snippet from"
     else:
         operation_desc = f"perform {operation_type} operation on"
@@ -339,7 +246,7 @@ def handle_delete_file_permission(
     Returns:
         True if permission granted, False if denied
     """
-    preview = _preview_delete_file(file_path)
+    preview = _diff_of(_preview("delete_file", file_path))
     confirmed, user_feedback = prompt_for_file_permission(
         file_path, "delete", preview, message_group
     )
@@ -372,6 +279,23 @@ def handle_file_permission(
     Returns:
         True if permission granted, False if denied
     """
+    # Already approved in a bulk prompt showing this very preview
+    answer = (
+        operation_data.get(BULK_ANSWER_KEY)
+        if isinstance(operation_data, dict)
+        else None
+    )
+    if (
+        isinstance(answer, PermissionAnswer)
+        and answer.confirmed
+        and answer.preview is not None
+        and _file_signature(file_path) == answer.preview.signature
+    ):
+        _remember_preview(file_path, operation_data, answer.preview)
+        set_diff_already_shown(answer.diff_shown)
+        _set_user_feedback(answer.user_feedback)
+        return True
+
     # Generate preview from operation_data if provided
     if operation_data is not None:
         preview = _generate_preview_from_operation_data(
@@ -386,11 +310,75 @@ def handle_file_permission(
     return confirmed
 
 
+def handle_file_permission_bulk(
+    context: Any,
+    operations: list[tuple[str, str, Any]],
+    message_group: str | None = None,
+) -> list[PermissionAnswer | None] | None:
+    """Callback handler asking once for a whole batch of file operations.
+
+    Previews are computed concurrently and shown in a single prompt. Only the
+    operations whose diff is part of that prompt are answered; the rest (e.g. a
+    preview that could not be computed) are left to ``handle_file_permission``,
+    which is still called for every operation and skips its own prompt for
+    those approved here.
+
+    Args:
+        context: The operation context
+        operations: (file_path, operation, operation_data) for each operation
+        message_group: Optional message group
+
+    Returns:
+        One answer per operation, None for those not answered here, or None
+        if no operation could be previewed.
+    """
+    if not operations:
+        return None
+
+    workers = min(_BULK_PREVIEW_WORKERS, len(operations))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        previews = list(executor.map(lambda op: _compute_preview(*op), operations))
+
+    # Without a prompt (yolo mode) the diffs are shown after the edits instead
+    yolo = get_yolo_mode_cached()
+    answered = [
+        index
+        for index, preview in enumerate(previews)
+        if preview is not None and (yolo or preview.diff)
+    ]
+    if not answered:
+        return None
+
+    paths = [os.path.abspath(operations[index][0]) for index in answered]
+    combined = "".join(previews[index].diff for index in answered) or None
+    clear_diff_shown_flag()
+    confirmed, user_feedback = prompt_for_file_permission(
+        "\n📄 ".join(paths), f"edit {len(paths)} files", combined, message_group
+    )
+    shown = was_diff_already_shown()
+    clear_diff_shown_flag()
+    _set_user_feedback(user_feedback)
+
+    answers: list[PermissionAnswer | None] = [None] * len(operations)
+    for index in answered:
+        answers[index] = PermissionAnswer(
+            confirmed, user_feedback, previews[index], shown
+        )
+    return answers
+
+
+def _diff_of(preview: ComputedEdit | None) -> str | None:
+    return preview.diff if preview is not None else None
+
+
 def _generate_preview_from_operation_data(
     file_path: str, operation: str, operation_data: Any
 ) -> str | None:
     """Generate preview diff from operation data.
 
+    The full preview is kept per thread (see ``take_prepared_edit``) so the
+    file operation can reuse it instead of reading and diffing the file again.
+
     Args:
         file_path: Path to the file
         operation: Type of operation
@@ -399,33 +387,45 @@ def _generate_preview_from_operation_data(
     Returns:
         Preview diff or None if generation fails
     """
+    preview = _compute_preview(file_path, operation, operation_data)
+    _remember_preview(file_path, operation_data, preview)
+    return _diff_of(preview)
+
+
+def _compute_preview(
+    file_path: str, operation: str, operation_data: Any
+) -> ComputedEdit | None:
     try:
         if operation == "delete":
-            return _preview_delete_file(file_path)
+            return _preview("delete_file", file_path)
         elif operation == "write":
             content = operation_data.get("content", "")
             overwrite = operation_data.get("overwrite", False)
-            return _preview_write_to_file(file_path, content, overwrite)
+            return _preview("write", file_path, content=content, overwrite=overwrite)
         elif operation == "delete snippet from":
             snippet = operation_data.get("snippet", "")
-            return _preview_delete_snippet(file_path, snippet)
+            return _preview("delete_snippet", file_path, snippet=snippet)
         elif operation == "replace text in":
             replacements = operation_data.get("replacements", [])
-            return _preview_replace_in_file(file_path, replacements)
+            return _preview("replace", file_path, replacements=replacements)
         elif operation == "edit_file":
             # Handle edit_file operations
             if "delete_snippet" in operation_data:
-                return _preview_delete_snippet(
-                    file_path, operation_data["delete_snippet"]
+                return _preview(
+                    "delete_snippet",
+                    file_path,
+                    snippet=operation_data["delete_snippet"],
                 )
             elif "replacements" in operation_data:
-                return _preview_replace_in_file(
-                    file_path, operation_data["replacements"]
+                return _preview(
+                    "replace", file_path, replacements=operation_data["replacements"]
                 )
             elif "content" in operation_data:
                 content = operation_data.get("content", "")
                 overwrite = operation_data.get("overwrite", False)
-                return _preview_write_to_file(file_path, content, overwrite)
+                return _preview(
+                    "write", file_path, content=content, overwrite=overwrite
+                )
 
         return None
     except Exception:
@@ -518,6 +518,7 @@ This system lets users guide you interactively! 🐶✨
 
 # Register the callback for file permission handling
 register_callback("file_permission", handle_file_permission)
+register_callback("file_permission_bulk", handle_file_permission_bulk)
 
 # Register the prompt hook for file permission instructions
 register_callback("load_prompt", get_file_permission_prompt_additions)
@@ -59,7 +59,11 @@ from code_puppy.tools.command_runner import (
     register_agent_run_shell_command,
     register_agent_share_your_reasoning,
 )
-from code_puppy.tools.file_modifications import register_delete_file, register_edit_file
+from code_puppy.tools.file_modifications import (
+    register_delete_file,
+    register_edit_file,
+    register_edit_files,
+)
 from code_puppy.tools.file_operations import (
     register_grep,
     register_list_files,
@@ -77,6 +81,7 @@ TOOL_REGISTRY = {
     "grep": register_grep,
     # File Modifications
     "edit_file": register_edit_file,
+    "edit_files": register_edit_files,
     "delete_file": register_delete_file,
     # Command Runner
     "agent_run_shell_command": register_agent_run_shell_command,
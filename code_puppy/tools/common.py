@@ -1,16 +1,20 @@
 import fnmatch
+import functools
 import hashlib
 import os
+import random
+import re
 import sys
 import time
 from pathlib import Path
-from typing import Callable, Optional, Tuple
+from typing import Callable, Iterator, Optional, Tuple
 
 from prompt_toolkit import Application
 from prompt_toolkit.formatted_text import HTML
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.layout import Layout, Window
 from prompt_toolkit.layout.controls import FormattedTextControl
+from rapidfuzz import process
 from rapidfuzz.distance import JaroWinkler
 from rich.console import Console
 from rich.panel import Panel
@@ -569,6 +573,7 @@ def _get_lexer_for_extension(extension: str):
         return TextLexer()
 
 
+@functools.cache
 def _get_token_color(token_type) -> str:
     """Get color for a token type from our Monokai scheme.
 
@@ -577,6 +582,9 @@ def _get_token_color(token_type) -> str:
 
     Returns:
         Hex color string or color name
+
+    Token types are a small fixed set, so the scan below runs once per type
+    and every later token of that type is a cache hit.
     """
     if not PYGMENTS_AVAILABLE:
         return "#cccccc"
@@ -625,6 +633,10 @@ def _highlight_code_line(code: str, bg_color: str | None, lexer) -> Text:
     return text
 
 
+# Look for +++ b/filename.ext or --- a/filename.ext headers
+_DIFF_HEADER_EXTENSION_RE = re.compile(r"^(?:\+\+\+|---) [ab]/.*?(\.[a-zA-Z0-9]+)$")
+
+
 def _extract_file_extension_from_diff(diff_text: str) -> str:
     """Extract file extension from diff headers.
 
@@ -634,13 +646,8 @@ def _extract_file_extension_from_diff(diff_text: str) -> str:
     Returns:
         File extension (e.g., '.py') or '.txt' as fallback
     """
-    import re
-
-    # Look for +++ b/filename.ext or --- a/filename.ext headers
-    pattern = r"^(?:\+\+\+|---) [ab]/.*?(\.[a-zA-Z0-9]+)$"
-
-    for line in diff_text.split("\n")[:10]:  # Check first 10 lines
-        match = re.search(pattern, line)
+    for line in diff_text.split("\n", 10)[:10]:  # Check first 10 lines
+        match = _DIFF_HEADER_EXTENSION_RE.search(line)
         if match:
             return match.group(1)
 
@@ -674,29 +681,52 @@ def brighten_hex(hex_color: str, factor: float) -> str:
     return f"#{r:02x}{g:02x}{b:02x}"
 
 
-def _format_diff_with_syntax_highlighting(
+# Diffs are rendered at most this many characters deep; the rest is summarised
+_MAX_DIFF_CHARS = 1_000_000
+# Lines per Text chunk when a diff is printed progressively
+DIFF_CHUNK_LINES = 512
+
+
+def _split_diff_lines(diff_text: str) -> Tuple[list[str], int]:
+    """Split a diff into lines, cut at ``_MAX_DIFF_CHARS``.
+
+    Returns the lines to render and how many lines were left out.
+    """
+    omitted = 0
+    if len(diff_text) > _MAX_DIFF_CHARS:
+        cut = diff_text.rfind("\n", 0, _MAX_DIFF_CHARS) + 1
+        tail = diff_text[cut:]
+        omitted = tail.count("\n") + (0 if tail.endswith("\n") else 1)
+        diff_text = diff_text[:cut]
+    lines = diff_text.split("\n")
+    # Remove trailing empty line if it exists (from trailing \n in diff)
+    if lines and lines[-1] == "":
+        lines.pop()
+    return lines, omitted
+
+
+def _truncation_marker(omitted: int) -> Text:
+    return Text(f"… diff truncated, {omitted} more lines …", style="dim")
+
+
+def _iter_diff_with_syntax_highlighting(
     diff_text: str,
     addition_color: str | None = None,
     deletion_color: str | None = None,
-) -> Text:
-    """Format diff with full syntax highlighting using Pygments.
+    chunk_lines: int = DIFF_CHUNK_LINES,
+) -> Iterator[Text]:
+    """Yield the highlighted diff as Text chunks of up to ``chunk_lines`` lines.
 
-    This renders diffs with:
-    - Syntax highlighting for code tokens
-    - Colored backgrounds for context/added/removed lines
-    - Monokai color scheme
-    - Optional custom colors for additions/deletions
-
-    Args:
-        diff_text: Raw unified diff text
-        addition_color: Optional custom color for added lines (default: green)
-        deletion_color: Optional custom color for deleted lines (default: red)
-
-    Returns:
-        Rich Text object with syntax highlighting (can be passed to emit_info)
+    Chunks carry no trailing newline, so printing each one in turn reproduces
+    the whole diff without holding all of it in memory at once.
     """
+    lines, omitted = _split_diff_lines(diff_text)
     if not PYGMENTS_AVAILABLE:
-        return Text(diff_text)
+        for start in range(0, len(lines), chunk_lines):
+            yield Text("\n".join(lines[start : start + chunk_lines]))
+        if omitted:
+            yield _truncation_marker(omitted)
+        return
 
     # Extract file extension from diff headers
     extension = _extract_file_extension_from_diff(diff_text)
@@ -714,21 +744,15 @@ def _format_diff_with_syntax_highlighting(
         "context": None,  # No background for unchanged lines
     }
 
-    lines = diff_text.split("\n")
-    # Remove trailing empty line if it exists (from trailing \n in diff)
-    if lines and lines[-1] == "":
-        lines = lines[:-1]
+    last = len(lines) - 1
     result = Text()
 
     for i, line in enumerate(lines):
         if not line:
-            # Empty line - just add a newline if not the last line
-            if i < len(lines) - 1:
-                result.append("\n")
-            continue
-
+            # Empty line - only the separator below
+            pass
         # Handle diff headers specially
-        if line.startswith("---"):
+        elif line.startswith("---"):
             result.append(line, style="yellow")
         elif line.startswith("+++"):
             result.append(line, style="yellow")
@@ -765,11 +789,49 @@ def _format_diff_with_syntax_highlighting(
             highlighted = _highlight_code_line(code, bg_colors[line_type], lexer)
             result.append_text(highlighted)
 
-        # Add newline after each line except the last
-        if i < len(lines) - 1:
+        if i == last:
+            break
+        if (i + 1) % chunk_lines == 0:
+            yield result
+            result = Text()
+        else:
+            # Add newline after each line except the last
             result.append("\n")
 
-    return result
+    if omitted:
+        if lines:
+            result.append("\n")
+        result.append_text(_truncation_marker(omitted))
+    yield result
+
+
+def _format_diff_with_syntax_highlighting(
+    diff_text: str,
+    addition_color: str | None = None,
+    deletion_color: str | None = None,
+) -> Text:
+    """Format diff with full syntax highlighting using Pygments.
+
+    This renders diffs with:
+    - Syntax highlighting for code tokens
+    - Colored backgrounds for context/added/removed lines
+    - Monokai color scheme
+    - Optional custom colors for additions/deletions
+
+    Diffs longer than ``_MAX_DIFF_CHARS`` are cut short with a marker line.
+
+    Args:
+        diff_text: Raw unified diff text
+        addition_color: Optional custom color for added lines (default: green)
+        deletion_color: Optional custom color for deleted lines (default: red)
+
+    Returns:
+        Rich Text object with syntax highlighting (can be passed to emit_info)
+    """
+    chunks = _iter_diff_with_syntax_highlighting(
+        diff_text, addition_color, deletion_color, chunk_lines=sys.maxsize
+    )
+    return Text("\n").join(chunks)
 
 
 def format_diff_with_colors(diff_text: str) -> Text:
@@ -788,28 +850,34 @@ def format_diff_with_colors(diff_text: str) -> Text:
     Returns:
         Rich Text object with syntax highlighting
     """
+    return Text("\n").join(iter_diff_with_colors(diff_text, chunk_lines=sys.maxsize))
+
+
+def iter_diff_with_colors(
+    diff_text: str, chunk_lines: int = DIFF_CHUNK_LINES
+) -> Iterator[Text]:
+    """Yield ``format_diff_with_colors`` output in chunks of ``chunk_lines`` lines.
+
+    Print each chunk in turn to show a large diff progressively instead of
+    building one Text for all of it.
+    """
     from code_puppy.config import (
         get_diff_addition_color,
         get_diff_deletion_color,
     )
 
     if not diff_text or not diff_text.strip():
-        return Text("-- no diff available --", style="dim")
-
-    addition_base_color = get_diff_addition_color()
-    deletion_base_color = get_diff_deletion_color()
+        yield Text("-- no diff available --", style="dim")
+        return
 
-    # Always use beautiful syntax highlighting!
     if not PYGMENTS_AVAILABLE:
         emit_warning("Pygments not available, diffs will look plain")
-        # Return plain text as fallback
-        return Text(diff_text)
 
-    # Return Text object with custom colors - emit_info handles this correctly
-    return _format_diff_with_syntax_highlighting(
+    yield from _iter_diff_with_syntax_highlighting(
         diff_text,
-        addition_color=addition_base_color,
-        deletion_color=deletion_base_color,
+        addition_color=get_diff_addition_color(),
+        deletion_color=get_diff_deletion_color(),
+        chunk_lines=chunk_lines,
     )
 
 
@@ -1139,8 +1207,7 @@ def get_user_approval(
         else:
             # User wants to provide feedback
             confirmed = False
-            emit_info("")
-            emit_info(f"Tell {puppy_name} what to change:")
+            emit_info(f"\nTell {puppy_name} what to change:")
             user_feedback = Prompt.ask(
                 "[bold green]➤[/bold green]",
                 default="",
@@ -1170,15 +1237,14 @@ def get_user_approval(
         sys.stderr.flush()
 
     # Show result BEFORE resuming spinners (no puppy litter!)
-    emit_info("")
     if not confirmed:
         if user_feedback:
-            emit_error("Rejected with feedback!")
+            emit_error("\nRejected with feedback!")
             emit_warning(f'Telling {puppy_name}: "{user_feedback}"')
         else:
-            emit_error("Rejected.")
+            emit_error("\nRejected.")
     else:
-        emit_success("Approved!")
+        emit_success("\nApproved!")
 
     # NOW resume spinners after showing the result
     try:
@@ -1307,8 +1373,7 @@ async def get_user_approval_async(
         else:
             # User wants to provide feedback
             confirmed = False
-            emit_info("")
-            emit_info(f"Tell {puppy_name} what to change:")
+            emit_info(f"\nTell {puppy_name} what to change:")
             user_feedback = Prompt.ask(
                 "[bold green]➤[/bold green]",
                 default="",
@@ -1338,15 +1403,14 @@ async def get_user_approval_async(
         sys.stderr.flush()
 
     # Show result BEFORE resuming spinners (no puppy litter!)
-    emit_info("")
     if not confirmed:
         if user_feedback:
-            emit_error("Rejected with feedback!")
+            emit_error("\nRejected with feedback!")
             emit_warning(f'Telling {puppy_name}: "{user_feedback}"')
         else:
-            emit_error("Rejected.")
+            emit_error("\nRejected.")
     else:
-        emit_success("Approved!")
+        emit_success("\nApproved!")
 
     # NOW resume spinners after showing the result
     try:
@@ -1369,19 +1433,22 @@ def _find_best_window(
     If nothing clears JW_THRESHOLD, return (None, score).
     """
     needle = needle.rstrip("\n")
-    needle_lines = needle.splitlines()
-    win_size = len(needle_lines)
+    win_size = len(needle.splitlines())
+    windows = (
+        "\n".join(haystack_lines[i : i + win_size])
+        for i in range(len(haystack_lines) - win_size + 1)
+    )
+    # One native scan over all windows: rapidfuzz raises its cutoff to the best
+    # score so far as it goes, and stops early on a perfect match
+    match = process.extractOne(
+        needle, windows, scorer=JaroWinkler.normalized_similarity
+    )
     best_score = 0.0
     best_span: Optional[Tuple[int, int]] = None
     best_window = ""
-    # Pre-join the needle once; join windows on the fly
-    for i in range(len(haystack_lines) - win_size + 1):
-        window = "\n".join(haystack_lines[i : i + win_size])
-        score = JaroWinkler.normalized_similarity(window, needle)
-        if score > best_score:
-            best_score = score
-            best_span = (i, i + win_size)
-            best_window = window
+    if match is not None and match[1] > 0:
+        best_window, best_score, start = match
+        best_span = (start, start + win_size)
 
     # Debug logging
     console.log(best_span)
@@ -1390,25 +1457,33 @@ def _find_best_window(
     return best_span, best_score
 
 
-def generate_group_id(tool_name: str, extra_context: str = "") -> str:
+def generate_group_id(
+    tool_name: str, extra_context: str = "", call_id: Optional[str] = None
+) -> str:
     """Generate a unique group_id for tool output grouping.
 
     Args:
         tool_name: Name of the tool (e.g., 'list_files', 'edit_file')
         extra_context: Optional extra context to make group_id more unique
+        call_id: Optional id of the tool call being grouped (RunContext.tool_call_id).
+            When given, the group_id is derived from it deterministically, so the
+            same call always maps to the same group and no clock or RNG is read.
 
     Returns:
         A string in format: tool_name_hash
     """
-    # Create a unique identifier using timestamp, context, and a random component
-    import random
+    if call_id is not None:
+        key = f"{tool_name}\x00{extra_context}\x00{call_id}".encode()
+        return f"{tool_name}_{hashlib.blake2b(key, digest_size=4).hexdigest()}"
 
-    timestamp = str(int(time.time() * 1000000))  # microseconds for more uniqueness
+    # Create a unique identifier using timestamp, context, and a random component
+    timestamp = int(time.time() * 1000000)  # microseconds for more uniqueness
     random_component = random.randint(1000, 9999)  # Add randomness
     context_string = f"{tool_name}_{timestamp}_{random_component}_{extra_context}"
 
-    # Generate a short hash
-    hash_obj = hashlib.md5(context_string.encode())
-    short_hash = hash_obj.hexdigest()[:8]
+    # Generate a short hash (an id, not a security boundary)
+    short_hash = hashlib.md5(
+        context_string.encode(), usedforsecurity=False
+    ).hexdigest()[:8]
 
     return f"{tool_name}_{short_hash}"
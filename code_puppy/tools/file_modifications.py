@@ -10,17 +10,32 @@ Key guarantees
 
 from __future__ import annotations
 
-import difflib
+import functools
 import json
 import os
+import re
+import stat
 import traceback
-from typing import Any, Dict, List, Union
+from collections import Counter
+from dataclasses import dataclass
+from difflib import unified_diff
+from types import ModuleType
+from typing import Annotated, Any, Dict, List, Literal, Tuple, Union
 
 import json_repair
-from pydantic import BaseModel
+from pydantic import BaseModel, Discriminator, Tag, TypeAdapter, ValidationError
 from pydantic_ai import RunContext
 
-from code_puppy.callbacks import on_delete_file, on_edit_file
+from code_puppy.callbacks import (
+    has_listeners,
+    on_delete_file_first,
+    on_edit_file_first,
+)
+from code_puppy.config import (
+    get_diff_context_lines,
+    get_suppress_edit_diffs_cached,
+    get_yolo_mode_cached,
+)
 from code_puppy.messaging import (  # Structured messaging types
     DiffLine,
     DiffMessage,
@@ -30,44 +45,70 @@ from code_puppy.messaging import (  # Structured messaging types
 )
 from code_puppy.tools.common import _find_best_window, generate_group_id
 
+# Hunk header, e.g. "@@ -12,3 +14,5 @@"; group 1 is the new-file start line
+_HUNK_HEADER_RE = re.compile(r"@@ -\d+(?:,\d+)? \+(\d+)")
+
+
+@functools.cache
+def _permission_handler() -> ModuleType | None:
+    """Return the file permission handler plugin module, imported once.
 
-def _create_rejection_response(file_path: str) -> Dict[str, Any]:
+    The plugin imports from ``code_puppy.tools`` itself, so it cannot be imported
+    at module load without a cycle.
+    """
+    try:
+        from code_puppy.plugins.file_permission_handler import register_callbacks
+    except ImportError:
+        return None
+    return register_callbacks
+
+
+# Static parts of every rejection response; only path, message and feedback vary
+_REJECTION_MESSAGE = "USER REJECTED: The user explicitly rejected these file changes."
+_REJECTION_NO_FEEDBACK_MESSAGE = (
+    _REJECTION_MESSAGE
+    + " Please do not retry the same changes or any other changes - immediately ask for clarification."
+)
+_REJECTION_TEMPLATE: Dict[str, Any] = {
+    "success": False,
+    "changed": False,
+    "user_rejection": True,
+    "rejection_type": "explicit_user_denial",
+}
+
+
+def _create_rejection_response(
+    file_path: str, answer: PermissionAnswer | None = None
+) -> Dict[str, Any]:
     """Create a standardized rejection response with user feedback if available.
 
     Args:
         file_path: Path to the file that was rejected
+        answer: The bulk permission answer that rejected it, if any
 
     Returns:
         Dict containing rejection details and any user feedback
     """
     # Check for user feedback from permission handler
-    try:
-        from code_puppy.plugins.file_permission_handler.register_callbacks import (
-            clear_user_feedback,
-            get_last_user_feedback,
-        )
-
-        user_feedback = get_last_user_feedback()
+    handler = _permission_handler()
+    if answer is not None:
+        user_feedback = answer.user_feedback
+    elif handler is not None:
+        user_feedback = handler.get_last_user_feedback()
         # Clear feedback after reading it
-        clear_user_feedback()
-    except ImportError:
+        handler.clear_user_feedback()
+    else:
         user_feedback = None
 
-    rejection_message = (
-        "USER REJECTED: The user explicitly rejected these file changes."
-    )
     if user_feedback:
-        rejection_message += f" User feedback: {user_feedback}"
+        rejection_message = f"{_REJECTION_MESSAGE} User feedback: {user_feedback}"
     else:
-        rejection_message += " Please do not retry the same changes or any other changes - immediately ask for clarification."
+        rejection_message = _REJECTION_NO_FEEDBACK_MESSAGE
 
     return {
-        "success": False,
+        **_REJECTION_TEMPLATE,
         "path": file_path,
         "message": rejection_message,
-        "changed": False,
-        "user_rejection": True,
-        "rejection_type": "explicit_user_denial",
         "user_feedback": user_feedback,
     }
 
@@ -96,6 +137,38 @@ class ContentPayload(BaseModel):
 EditFilePayload = Union[DeleteSnippetPayload, ReplacementsPayload, ContentPayload]
 
 
+# Payload variants by their distinguishing key, in the priority edit_file uses
+# when a raw payload carries more than one of these keys
+_PAYLOAD_VARIANTS: Dict[str, type[BaseModel]] = {
+    "replacements": ReplacementsPayload,
+    "delete_snippet": DeleteSnippetPayload,
+    "content": ContentPayload,
+}
+
+
+def _payload_kind(value: Any) -> str | None:
+    """Name a payload's variant: by key for a raw dict, by model otherwise."""
+    if isinstance(value, dict):
+        return next((key for key in _PAYLOAD_VARIANTS if key in value), None)
+    return next(
+        (key for key, model in _PAYLOAD_VARIANTS.items() if isinstance(value, model)),
+        None,
+    )
+
+
+# Parses and validates a JSON string payload in one pydantic-core pass
+_PAYLOAD_JSON_ADAPTER: TypeAdapter[EditFilePayload] = TypeAdapter(
+    Annotated[
+        Union[
+            Annotated[ReplacementsPayload, Tag("replacements")],
+            Annotated[DeleteSnippetPayload, Tag("delete_snippet")],
+            Annotated[ContentPayload, Tag("content")],
+        ],
+        Discriminator(_payload_kind),
+    ]
+)
+
+
 def _parse_diff_lines(diff_text: str) -> List[DiffLine]:
     """Parse unified diff text into structured DiffLine objects.
 
@@ -112,31 +185,27 @@ def _parse_diff_lines(diff_text: str) -> List[DiffLine]:
     line_number = 0
 
     for line in diff_text.splitlines():
-        # Determine line type based on diff markers
-        if line.startswith("+") and not line.startswith("+++"):
-            line_type = "add"
-            line_number += 1
-            content = line[1:]  # Remove the + prefix
-        elif line.startswith("-") and not line.startswith("---"):
-            line_type = "remove"
-            line_number += 1
-            content = line[1:]  # Remove the - prefix
-        elif line.startswith("@@"):
+        # Determine line type from the first character, once per line
+        marker = line[:1]
+        if marker == "+" or marker == "-":
+            if line[1:3] == marker * 2:
+                # File headers (--- / +++) - treat as context
+                line_type = "context"
+                content = line
+            else:
+                line_type = "add" if marker == "+" else "remove"
+                line_number += 1
+                content = line[1:]  # Remove the +/- prefix
+        elif marker == "@" and line.startswith("@@"):
             # Parse hunk header to get line number
             # Format: @@ -start,count +start,count @@
-            import re
-
-            match = re.search(r"@@ -\d+(?:,\d+)? \+(\d+)", line)
+            match = _HUNK_HEADER_RE.search(line)
             if match:
                 line_number = (
                     int(match.group(1)) - 1
                 )  # Will be incremented on next line
             line_type = "context"
             content = line
-        elif line.startswith("---") or line.startswith("+++"):
-            # File headers - treat as context
-            line_type = "context"
-            content = line
         else:
             line_type = "context"
             line_number += 1
@@ -170,18 +239,12 @@ def _emit_diff_message(
         new_content: New file content (optional)
     """
     # Check if diff was already shown during permission prompt
-    try:
-        from code_puppy.plugins.file_permission_handler.register_callbacks import (
-            clear_diff_shown_flag,
-            was_diff_already_shown,
-        )
-
-        if was_diff_already_shown():
-            # Diff already displayed in permission panel, skip redundant display
-            clear_diff_shown_flag()
-            return
-    except ImportError:
-        pass  # Permission handler not available, emit anyway
+    # (if the permission handler is not available, emit anyway)
+    handler = _permission_handler()
+    if handler is not None and handler.was_diff_already_shown():
+        # Diff already displayed in permission panel, skip redundant display
+        handler.clear_diff_shown_flag()
+        return
 
     if not diff_text or not diff_text.strip():
         return
@@ -198,216 +261,469 @@ def _emit_diff_message(
     get_message_bus().emit(diff_msg)
 
 
-def _log_error(
-    msg: str, exc: Exception | None = None, message_group: str | None = None
-) -> None:
-    emit_error(f"{msg}", message_group=message_group)
-    if exc is not None:
-        emit_error(traceback.format_exc(), highlight=False, message_group=message_group)
+def _stat_or_none(file_path: str) -> os.stat_result | None:
+    """Return os.stat() for a path, or None if it does not exist or is unreadable."""
+    try:
+        return os.stat(file_path)
+    except (OSError, ValueError):
+        return None
 
 
-def _delete_snippet_from_file(
-    context: RunContext | None,
+def _stat_regular(file_path: str) -> os.stat_result | None:
+    """Return os.stat() for a regular file, or None; one syscall for exists+isfile."""
+    st = _stat_or_none(file_path)
+    return st if st is not None and stat.S_ISREG(st.st_mode) else None
+
+
+def _read_text(file_path: str) -> str:
+    """Read a file as UTF-8 in one decode pass.
+
+    Bytes are decoded as-is, so CRLF line endings survive an edit; invalid
+    UTF-8 becomes U+FFFD rather than failing the read.
+    """
+    with open(file_path, "rb") as f:
+        return f.read().decode("utf-8", errors="replace")
+
+
+def _write_text(file_path: str, text: str) -> None:
+    """Write text as UTF-8 without newline translation."""
+    with open(file_path, "wb") as f:
+        f.write(text.encode("utf-8"))
+
+
+def _unified_diff(
     file_path: str,
-    snippet: str,
-    message_group: str | None = None,
-) -> Dict[str, Any]:
-    file_path = os.path.abspath(file_path)
-    diff_text = ""
-    try:
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
-            return {"error": f"File '{file_path}' does not exist.", "diff": diff_text}
-        with open(file_path, "r", encoding="utf-8", errors="surrogateescape") as f:
-            original = f.read()
-        # Sanitize any surrogate characters from reading
-        try:
-            original = original.encode("utf-8", errors="surrogatepass").decode(
-                "utf-8", errors="replace"
-            )
-        except (UnicodeEncodeError, UnicodeDecodeError):
-            pass
-        if snippet not in original:
-            return {
-                "error": f"Snippet not found in file '{file_path}'.",
-                "diff": diff_text,
-            }
-        modified = original.replace(snippet, "")
-        from code_puppy.config import get_diff_context_lines
-
-        diff_text = "".join(
-            difflib.unified_diff(
-                original.splitlines(keepends=True),
-                modified.splitlines(keepends=True),
-                fromfile=f"a/{os.path.basename(file_path)}",
-                tofile=f"b/{os.path.basename(file_path)}",
-                n=get_diff_context_lines(),
-            )
+    old_lines: List[str],
+    new_lines: List[str],
+    new_file: bool = False,
+) -> str:
+    """Return the unified diff text for a file, labelled with its basename."""
+    name = os.path.basename(file_path)
+    return "".join(
+        unified_diff(
+            old_lines,
+            new_lines,
+            fromfile="/dev/null" if new_file else f"a/{name}",
+            tofile=f"b/{name}",
+            n=get_diff_context_lines(),
         )
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(modified)
-        return {
-            "success": True,
-            "path": file_path,
-            "message": "Snippet deleted from file.",
-            "changed": True,
-            "diff": diff_text,
-        }
-    except Exception as exc:
-        return {"error": str(exc), "diff": diff_text}
+    )
 
 
-def _replace_in_file(
-    context: RunContext | None,
-    path: str,
-    replacements: List[Dict[str, str]],
-    message_group: str | None = None,
-) -> Dict[str, Any]:
-    """Robust replacement engine with explicit edge‑case reporting."""
-    file_path = os.path.abspath(path)
+def _log_error(
+    msg: str, exc: Exception | None = None, message_group: str | None = None
+) -> None:
+    emit_error(f"{msg}", message_group=message_group)
+    if exc is not None:
+        emit_error(traceback.format_exc(), highlight=False, message_group=message_group)
 
-    with open(file_path, "r", encoding="utf-8", errors="surrogateescape") as f:
-        original = f.read()
 
-    # Sanitize any surrogate characters from reading
-    try:
-        original = original.encode("utf-8", errors="surrogatepass").decode(
-            "utf-8", errors="replace"
-        )
-    except (UnicodeEncodeError, UnicodeDecodeError):
-        pass
+def _match_line_endings(text: str, original: str) -> str:
+    """Return ``text`` with its newlines rewritten to ``original``'s dominant style.
 
+    Files are read without newline translation, so a CRLF file must be matched
+    (and patched) with CRLF snippets. ``text`` itself is returned unchanged
+    when there is nothing to convert.
+    """
+    if "\n" not in text or "\r\n" not in original:
+        return text
+    if original.count("\r\n") * 2 <= original.count("\n"):
+        return text
+    return text.replace("\r\n", "\n").replace("\n", "\r\n")
+
+
+def _apply_replacements(
+    original: str, replacements: List[Dict[str, str]]
+) -> Tuple[str, Dict[str, Any] | None]:
+    """Apply replacements in order: exact substring first, fuzzy line window second.
+
+    Returns the new text and None, or the text so far and the failing snippet's
+    details when no window scores at least 0.95. Consecutive fuzzy edits splice
+    one shared line list instead of re-splitting the whole file each time, and
+    the replaced window keeps the file's own line endings.
+    """
     modified = original
+    # modified.splitlines(keepends=True) and the same lines without endings,
+    # kept in sync across fuzzy edits; None after an exact replacement
+    lines: List[str] | None = None
+    bare: List[str] = []
     for rep in replacements:
         old_snippet = rep.get("old_str", "")
         new_snippet = rep.get("new_str", "")
 
+        if old_snippet and old_snippet not in modified:
+            # LF snippets sent for a CRLF file still match exactly
+            converted = _match_line_endings(old_snippet, modified)
+            if converted is not old_snippet and converted in modified:
+                old_snippet = converted
+                new_snippet = _match_line_endings(new_snippet, modified)
+
         if old_snippet and old_snippet in modified:
             modified = modified.replace(old_snippet, new_snippet)
+            lines = None
             continue
 
-        orig_lines = modified.splitlines()
-        loc, score = _find_best_window(orig_lines, old_snippet)
+        if lines is None:
+            lines = modified.splitlines(keepends=True)
+            bare = modified.splitlines()
+        loc, score = _find_best_window(bare, old_snippet)
 
         if score < 0.95 or loc is None:
-            return {
-                "error": "No suitable match in file (JW < 0.95)",
-                "jw_score": score,
-                "received": old_snippet,
-                "diff": "",
-            }
+            return modified, {"jw_score": score, "received": old_snippet}
 
         start, end = loc
-        modified = (
-            "\n".join(orig_lines[:start])
-            + "\n"
-            + new_snippet.rstrip("\n")
-            + "\n"
-            + "\n".join(orig_lines[end:])
-        )
+        eol = lines[start][len(bare[start]) :] if start < len(lines) else ""
+        eol = eol or "\n"
+        # The window's last line may be the file's unterminated final line
+        last_eol = lines[end - 1][len(bare[end - 1]) :] if end > start else eol
+        new_bare = new_snippet.rstrip("\n").splitlines()
+        new_lines = [line + eol for line in new_bare]
+        if new_lines:
+            new_lines[-1] = new_bare[-1] + last_eol
+        lines[start:end] = new_lines
+        bare[start:end] = new_bare
+        modified = "".join(lines)
+
+    return modified, None
+
+
+@dataclass(frozen=True)
+class ComputedEdit:
+    """The outcome of an edit operation, computed without touching the file.
+
+    ``signature`` is the (mtime_ns, size) of the file when it was read, or None
+    if it did not exist; ``modified`` is None when the edit deletes the file.
+    """
+
+    diff: str
+    original: str | None
+    modified: str | None
+    signature: Tuple[int, int] | None
+
+
+# operation_data key under which a file_permission handler receives the bulk
+# answer already given for the operation
+BULK_ANSWER_KEY = "bulk_answer"
+
+
+@dataclass(frozen=True)
+class PermissionAnswer:
+    """A ``file_permission_bulk`` handler's answer for one operation of a batch.
+
+    An approval carries the ``preview`` whose diff the user approved; it is
+    applied as-is, and only while the file is unchanged since it was read.
+    """
+
+    confirmed: bool
+    user_feedback: str | None = None
+    preview: ComputedEdit | None = None
+    diff_shown: bool = False
+
+
+def _signature(st: os.stat_result | None) -> Tuple[int, int] | None:
+    return None if st is None else (st.st_mtime_ns, st.st_size)
+
+
+def _unchanged_write(
+    file_path: str, content: str, st: os.stat_result | None
+) -> Dict[str, Any] | None:
+    """The no-op result when the file already holds ``content``, else None."""
+    if st is None:
+        return None
+    encoded = content.encode("utf-8")
+    # Same size is cheap to check; only then compare the bytes
+    if st.st_size != len(encoded):
+        return None
+    try:
+        with open(file_path, "rb") as f:
+            if f.read() != encoded:
+                return None
+    except OSError:
+        return None
+    return {
+        "success": True,
+        "path": file_path,
+        "message": f"File '{file_path}' already has this content.",
+        "changed": False,
+        "diff": "",
+    }
 
-    if modified == original:
-        emit_warning(
-            "No changes to apply – proposed content is identical.",
-            message_group=message_group,
-        )
-        return {
-            "success": False,
-            "path": file_path,
-            "message": "No changes to apply.",
-            "changed": False,
-            "diff": "",
-        }
 
-    from code_puppy.config import get_diff_context_lines
+def _compute_edit(
+    op: Literal["write", "replace", "delete_snippet", "delete_file"],
+    file_path: str,
+    *,
+    content: str = "",
+    overwrite: bool = False,
+    replacements: List[Dict[str, str]] | None = None,
+    snippet: str = "",
+    build_diff: bool = True,
+) -> Tuple[ComputedEdit | None, Dict[str, Any] | None]:
+    """Read, transform and diff a file for one edit operation, without writing.
+
+    Returns the edit and None, or None and the result to report when there is
+    nothing to apply. The permission preview and the edit itself both come
+    through here, so what the user approves is exactly what gets written.
+    With ``build_diff`` False the edit's diff is left empty.
+    """
+    file_path = os.path.abspath(file_path)
+
+    if op == "write":
+        st = _stat_or_none(file_path)
+        if st is not None and not overwrite:
+            return None, {
+                "success": False,
+                "path": file_path,
+                "message": f"Cowardly refusing to overwrite existing file: {file_path}",
+                "changed": False,
+                "diff": "",
+            }
+        unchanged = _unchanged_write(file_path, content, st)
+        if unchanged is not None:
+            return None, unchanged
+        diff_text = (
+            _unified_diff(
+                file_path,
+                [""] if st is not None else [],
+                content.splitlines(keepends=True),
+                new_file=st is None,
+            )
+            if build_diff
+            else ""
+        )
+        return ComputedEdit(diff_text, None, content, _signature(st)), None
+
+    if op == "replace":
+        st = _stat_or_none(file_path)
+        original = _read_text(file_path)
+        modified, no_match = _apply_replacements(original, replacements or [])
+        if no_match is not None:
+            return None, {
+                "error": "No suitable match in file (JW < 0.95)",
+                **no_match,
+                "diff": "",
+            }
+        if modified == original:
+            return None, {
+                "success": False,
+                "path": file_path,
+                "message": "No changes to apply.",
+                "changed": False,
+                "diff": "",
+            }
+    else:
+        st = _stat_regular(file_path)
+        if st is None:
+            return None, {"error": f"File '{file_path}' does not exist.", "diff": ""}
+        original = _read_text(file_path)
+        if op == "delete_file":
+            diff_text = (
+                _unified_diff(file_path, original.splitlines(keepends=True), [])
+                if build_diff
+                else ""
+            )
+            return ComputedEdit(diff_text, original, None, _signature(st)), None
+        if snippet not in original:
+            snippet = _match_line_endings(snippet, original)
+        if snippet not in original:
+            return None, {
+                "error": f"Snippet not found in file '{file_path}'.",
+                "diff": "",
+            }
+        modified = original.replace(snippet, "")
 
-    diff_text = "".join(
-        difflib.unified_diff(
+    diff_text = (
+        _unified_diff(
+            file_path,
             original.splitlines(keepends=True),
             modified.splitlines(keepends=True),
-            fromfile=f"a/{os.path.basename(file_path)}",
-            tofile=f"b/{os.path.basename(file_path)}",
-            n=get_diff_context_lines(),
         )
+        if build_diff
+        else ""
     )
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(modified)
+    return ComputedEdit(diff_text, original, modified, _signature(st)), None
+
+
+def _commit_edit(file_path: str, edit: ComputedEdit, message: str) -> Dict[str, Any]:
+    """Write (or delete) a computed edit; the only step that touches the file."""
+    file_path = os.path.abspath(file_path)
+    if edit.modified is None:
+        os.remove(file_path)
+    else:
+        if edit.signature is None:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        _write_text(file_path, edit.modified)
     return {
         "success": True,
         "path": file_path,
-        "message": "Replacements applied.",
+        "message": message,
         "changed": True,
-        "diff": diff_text,
+        "diff": edit.diff,
     }
 
 
+def _delete_snippet_from_file(
+    context: RunContext | None,
+    file_path: str,
+    snippet: str,
+    message_group: str | None = None,
+    edit: ComputedEdit | None = None,
+    build_diff: bool = True,
+) -> Dict[str, Any]:
+    try:
+        if edit is None:
+            edit, outcome = _compute_edit(
+                "delete_snippet", file_path, snippet=snippet, build_diff=build_diff
+            )
+            if outcome is not None:
+                return outcome
+        return _commit_edit(file_path, edit, "Snippet deleted from file.")
+    except Exception as exc:
+        return {"error": str(exc), "diff": edit.diff if edit is not None else ""}
+
+
+def _replace_in_file(
+    context: RunContext | None,
+    path: str,
+    replacements: List[Dict[str, str]],
+    message_group: str | None = None,
+    edit: ComputedEdit | None = None,
+    build_diff: bool = True,
+) -> Dict[str, Any]:
+    """Robust replacement engine with explicit edge‑case reporting."""
+    if edit is None:
+        edit, outcome = _compute_edit(
+            "replace", path, replacements=replacements, build_diff=build_diff
+        )
+        if outcome is not None:
+            if "error" not in outcome:
+                emit_warning(
+                    "No changes to apply – proposed content is identical.",
+                    message_group=message_group,
+                )
+            return outcome
+    return _commit_edit(path, edit, "Replacements applied.")
+
+
 def _write_to_file(
     context: RunContext | None,
     path: str,
     content: str,
     overwrite: bool = False,
     message_group: str | None = None,
+    edit: ComputedEdit | None = None,
+    build_diff: bool = True,
 ) -> Dict[str, Any]:
-    file_path = os.path.abspath(path)
-
     try:
-        exists = os.path.exists(file_path)
-        if exists and not overwrite:
-            return {
-                "success": False,
-                "path": file_path,
-                "message": f"Cowardly refusing to overwrite existing file: {file_path}",
-                "changed": False,
-                "diff": "",
-            }
+        if edit is None:
+            edit, outcome = _compute_edit(
+                "write",
+                path,
+                content=content,
+                overwrite=overwrite,
+                build_diff=build_diff,
+            )
+            if outcome is not None:
+                return outcome
+        action = "overwritten" if edit.signature is not None else "created"
+        return _commit_edit(
+            path, edit, f"File '{os.path.abspath(path)}' {action} successfully."
+        )
+    except Exception as exc:
+        _log_error("Unhandled exception in write_to_file", exc)
+        return {"error": str(exc), "diff": ""}
 
-        from code_puppy.config import get_diff_context_lines
 
-        diff_lines = difflib.unified_diff(
-            [] if not exists else [""],
-            content.splitlines(keepends=True),
-            fromfile="/dev/null" if not exists else f"a/{os.path.basename(file_path)}",
-            tofile=f"b/{os.path.basename(file_path)}",
-            n=get_diff_context_lines(),
-        )
-        diff_text = "".join(diff_lines)
+def _diff_wanted() -> bool:
+    """Whether an edit's diff will be shown to anyone.
 
-        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+    Diffs are only ever displayed; with suppress_edit_diffs in yolo mode there
+    is no permission prompt and no diff output, so building one is wasted work.
+    """
+    return not (get_yolo_mode_cached() and get_suppress_edit_diffs_cached())
 
-        action = "overwritten" if exists else "created"
-        return {
-            "success": True,
-            "path": file_path,
-            "message": f"File '{file_path}' {action} successfully.",
-            "changed": True,
-            "diff": diff_text,
-        }
 
-    except Exception as exc:
-        _log_error("Unhandled exception in write_to_file", exc)
-        return {"error": str(exc), "diff": ""}
+def _call_id(context: RunContext | None) -> str | None:
+    """The id of the tool call being run, for deterministic group ids."""
+    call_id = getattr(context, "tool_call_id", None)
+    return call_id if isinstance(call_id, str) else None
 
 
-def delete_snippet_from_file(
-    context: RunContext, file_path: str, snippet: str, message_group: str | None = None
-) -> Dict[str, Any]:
+def _permission_denied(permission_results: List[Any]) -> bool:
+    """Return True if any handler answered falsy; None means it abstained."""
+    for result in permission_results:
+        if result is not None and not result:
+            return True
+    return False
+
+
+def _take_prepared_edit(file_path: str, operation_data: Any) -> ComputedEdit | None:
+    """Return the permission preview computed for this operation, if still valid."""
+    handler = _permission_handler()
+    if handler is None:
+        return None
+    return handler.take_prepared_edit(file_path, operation_data)
+
+
+def _file_permission(
+    context: RunContext | None,
+    file_path: str,
+    operation: str,
+    message_group: str | None,
+    operation_data: Any,
+    answer: PermissionAnswer | None = None,
+) -> Tuple[Dict[str, Any] | None, ComputedEdit | None]:
+    """Ask for permission to modify a file: (rejection response or None, prepared edit).
+
+    Every ``file_permission`` handler is asked, even for an operation a bulk
+    handler approved: the ``answer`` rides along in ``operation_data`` under
+    ``BULK_ANSWER_KEY``, so the handler that showed it need not prompt again.
+    A bulk denial needs no second opinion.
+    """
+    if answer is not None and not answer.confirmed:
+        return _create_rejection_response(file_path, answer), None
+    if answer is not None:
+        operation_data = {**operation_data, BULK_ANSWER_KEY: answer}
+
     # Use the plugin system for permission handling with operation data
     from code_puppy.callbacks import on_file_permission
 
-    operation_data = {"snippet": snippet}
     permission_results = on_file_permission(
-        context, file_path, "delete snippet from", None, message_group, operation_data
+        context, file_path, operation, None, message_group, operation_data
     )
+    prepared = _take_prepared_edit(file_path, operation_data)
 
     # If any permission handler denies the operation, return cancelled result
-    if permission_results and any(
-        not result for result in permission_results if result is not None
-    ):
-        return _create_rejection_response(file_path)
+    if _permission_denied(permission_results):
+        return _create_rejection_response(file_path), None
+    return None, prepared
+
+
+def delete_snippet_from_file(
+    context: RunContext,
+    file_path: str,
+    snippet: str,
+    message_group: str | None = None,
+    answer: PermissionAnswer | None = None,
+) -> Dict[str, Any]:
+    rejection, prepared = _file_permission(
+        context,
+        file_path,
+        "delete snippet from",
+        message_group,
+        {"snippet": snippet},
+        answer,
+    )
+    if rejection is not None:
+        return rejection
 
     res = _delete_snippet_from_file(
-        context, file_path, snippet, message_group=message_group
+        context,
+        file_path,
+        snippet,
+        message_group=message_group,
+        edit=prepared,
+        build_diff=prepared is None and _diff_wanted(),
     )
     diff = res.get("diff", "")
     if diff:
@@ -421,23 +737,30 @@ def write_to_file(
     content: str,
     overwrite: bool,
     message_group: str | None = None,
+    answer: PermissionAnswer | None = None,
 ) -> Dict[str, Any]:
-    # Use the plugin system for permission handling with operation data
-    from code_puppy.callbacks import on_file_permission
+    # Nothing to ask about when the file already holds this content
+    if overwrite:
+        abs_path = os.path.abspath(path)
+        unchanged = _unchanged_write(abs_path, content, _stat_or_none(abs_path))
+        if unchanged is not None:
+            return unchanged
 
     operation_data = {"content": content, "overwrite": overwrite}
-    permission_results = on_file_permission(
-        context, path, "write", None, message_group, operation_data
+    rejection, prepared = _file_permission(
+        context, path, "write", message_group, operation_data, answer
     )
-
-    # If any permission handler denies the operation, return cancelled result
-    if permission_results and any(
-        not result for result in permission_results if result is not None
-    ):
-        return _create_rejection_response(path)
+    if rejection is not None:
+        return rejection
 
     res = _write_to_file(
-        context, path, content, overwrite=overwrite, message_group=message_group
+        context,
+        path,
+        content,
+        overwrite=overwrite,
+        message_group=message_group,
+        edit=prepared,
+        build_diff=prepared is None and _diff_wanted(),
     )
     diff = res.get("diff", "")
     if diff:
@@ -452,30 +775,102 @@ def replace_in_file(
     path: str,
     replacements: List[Dict[str, str]],
     message_group: str | None = None,
+    answer: PermissionAnswer | None = None,
 ) -> Dict[str, Any]:
-    # Use the plugin system for permission handling with operation data
-    from code_puppy.callbacks import on_file_permission
-
-    operation_data = {"replacements": replacements}
-    permission_results = on_file_permission(
-        context, path, "replace text in", None, message_group, operation_data
+    rejection, prepared = _file_permission(
+        context,
+        path,
+        "replace text in",
+        message_group,
+        {"replacements": replacements},
+        answer,
+    )
+    if rejection is not None:
+        return rejection
+
+    res = _replace_in_file(
+        context,
+        path,
+        replacements,
+        message_group=message_group,
+        edit=prepared,
+        build_diff=prepared is None and _diff_wanted(),
     )
-
-    # If any permission handler denies the operation, return cancelled result
-    if permission_results and any(
-        not result for result in permission_results if result is not None
-    ):
-        return _create_rejection_response(path)
-
-    res = _replace_in_file(context, path, replacements, message_group=message_group)
     diff = res.get("diff", "")
     if diff:
         _emit_diff_message(path, "modify", diff)
     return res
 
 
+def _replacement_dicts(payload: ReplacementsPayload) -> List[Dict[str, str]]:
+    # Convert Pydantic Replacement models to dict format for legacy compatibility
+    return [
+        {"old_str": rep.old_str, "new_str": rep.new_str} for rep in payload.replacements
+    ]
+
+
+def _edit_delete_snippet(
+    context: RunContext,
+    file_path: str,
+    payload: DeleteSnippetPayload,
+    group_id: str,
+    answer: PermissionAnswer | None,
+) -> Dict[str, Any]:
+    return delete_snippet_from_file(
+        context, file_path, payload.delete_snippet, group_id, answer
+    )
+
+
+def _edit_replacements(
+    context: RunContext,
+    file_path: str,
+    payload: ReplacementsPayload,
+    group_id: str,
+    answer: PermissionAnswer | None,
+) -> Dict[str, Any]:
+    return replace_in_file(
+        context, file_path, _replacement_dicts(payload), group_id, answer
+    )
+
+
+def _edit_content(
+    context: RunContext,
+    file_path: str,
+    payload: ContentPayload,
+    group_id: str,
+    answer: PermissionAnswer | None,
+) -> Dict[str, Any]:
+    file_exists = os.path.exists(file_path)
+    if file_exists and not payload.overwrite:
+        return {
+            "success": False,
+            "path": file_path,
+            "message": f"File '{file_path}' exists. Set 'overwrite': true to replace.",
+            "changed": False,
+        }
+    return write_to_file(
+        context,
+        file_path,
+        payload.content,
+        payload.overwrite,
+        message_group=group_id,
+        answer=answer,
+    )
+
+
+# edit_file sub-tools, keyed like _PAYLOAD_VARIANTS
+_EDIT_HANDLERS: Dict[str, Any] = {
+    "replacements": _edit_replacements,
+    "delete_snippet": _edit_delete_snippet,
+    "content": _edit_content,
+}
+
+
 def _edit_file(
-    context: RunContext, payload: EditFilePayload, group_id: str | None = None
+    context: RunContext,
+    payload: EditFilePayload,
+    group_id: str | None = None,
+    answer: PermissionAnswer | None = None,
 ) -> Dict[str, Any]:
     """
     High-level implementation of the *edit_file* behaviour.
@@ -512,45 +907,18 @@ def _edit_file(
 
     # Use provided group_id or generate one if not provided
     if group_id is None:
-        group_id = generate_group_id("edit_file", file_path)
+        group_id = generate_group_id("edit_file", file_path, _call_id(context))
 
     try:
-        if isinstance(payload, DeleteSnippetPayload):
-            return delete_snippet_from_file(
-                context, file_path, payload.delete_snippet, message_group=group_id
-            )
-        elif isinstance(payload, ReplacementsPayload):
-            # Convert Pydantic Replacement models to dict format for legacy compatibility
-            replacements_dict = [
-                {"old_str": rep.old_str, "new_str": rep.new_str}
-                for rep in payload.replacements
-            ]
-            return replace_in_file(
-                context, file_path, replacements_dict, message_group=group_id
-            )
-        elif isinstance(payload, ContentPayload):
-            file_exists = os.path.exists(file_path)
-            if file_exists and not payload.overwrite:
-                return {
-                    "success": False,
-                    "path": file_path,
-                    "message": f"File '{file_path}' exists. Set 'overwrite': true to replace.",
-                    "changed": False,
-                }
-            return write_to_file(
-                context,
-                file_path,
-                payload.content,
-                payload.overwrite,
-                message_group=group_id,
-            )
-        else:
+        handler = _EDIT_HANDLERS.get(_payload_kind(payload))
+        if handler is None:
             return {
                 "success": False,
                 "path": file_path,
                 "message": f"Unknown payload type: {type(payload)}",
                 "changed": False,
             }
+        return handler(context, file_path, payload, group_id, answer)
     except Exception as e:
         emit_error(
             "Unable to route file modification tool call to sub-tool",
@@ -565,113 +933,22 @@ def _edit_file(
         }
 
 
-def _delete_file(
-    context: RunContext, file_path: str, message_group: str | None = None
-) -> Dict[str, Any]:
-    file_path = os.path.abspath(file_path)
-
-    # Use the plugin system for permission handling with operation data
-    from code_puppy.callbacks import on_file_permission
-
-    operation_data = {}  # No additional data needed for delete operations
-    permission_results = on_file_permission(
-        context, file_path, "delete", None, message_group, operation_data
-    )
-
-    # If any permission handler denies the operation, return cancelled result
-    if permission_results and any(
-        not result for result in permission_results if result is not None
-    ):
-        return _create_rejection_response(file_path)
-
-    try:
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
-            res = {"error": f"File '{file_path}' does not exist.", "diff": ""}
-        else:
-            with open(file_path, "r", encoding="utf-8", errors="surrogateescape") as f:
-                original = f.read()
-            # Sanitize any surrogate characters from reading
-            try:
-                original = original.encode("utf-8", errors="surrogatepass").decode(
-                    "utf-8", errors="replace"
-                )
-            except (UnicodeEncodeError, UnicodeDecodeError):
-                pass
-            from code_puppy.config import get_diff_context_lines
-
-            diff_text = "".join(
-                difflib.unified_diff(
-                    original.splitlines(keepends=True),
-                    [],
-                    fromfile=f"a/{os.path.basename(file_path)}",
-                    tofile=f"b/{os.path.basename(file_path)}",
-                    n=get_diff_context_lines(),
-                )
-            )
-            os.remove(file_path)
-            res = {
-                "success": True,
-                "path": file_path,
-                "message": f"File '{file_path}' deleted successfully.",
-                "changed": True,
-                "diff": diff_text,
-            }
-    except Exception as exc:
-        _log_error("Unhandled exception in delete_file", exc)
-        res = {"error": str(exc), "diff": ""}
-
-    diff = res.get("diff", "")
-    if diff:
-        _emit_diff_message(file_path, "delete", diff)
-    return res
-
-
-def register_edit_file(agent):
-    """Register only the edit_file tool."""
-
-    @agent.tool
-    def edit_file(
-        context: RunContext,
-        payload: EditFilePayload | str = "",
-    ) -> Dict[str, Any]:
-        """Comprehensive file editing tool supporting multiple modification strategies.
-
-        This is the primary file modification tool that supports three distinct editing
-        approaches: full content replacement, targeted text replacements, and snippet
-        deletion. It provides robust diff generation, error handling, and automatic
-        retry capabilities for reliable file operations.
-
-        Args:
-            context (RunContext): The PydanticAI runtime context for the agent.
-            payload: One of three payload types:
-
-                ContentPayload:
-                    - file_path (str): Path to file
-                    - content (str): Full file content to write
-                    - overwrite (bool, optional): Whether to overwrite existing files.
-                      Defaults to False (safe mode).
-
-                ReplacementsPayload:
-                    - file_path (str): Path to file
-                    - replacements (List[Replacement]): List of text replacements where
-                      each Replacement contains:
-                      - old_str (str): Exact text to find and replace
-                      - new_str (str): Replacement text
-
-                DeleteSnippetPayload:
-                    - file_path (str): Path to file
-                    - delete_snippet (str): Exact text snippet to remove from file
-
-        Returns:
-            Dict[str, Any]: Operation result containing:
-                - success (bool): True if operation completed successfully
-                - path (str): Absolute path to the modified file
-                - message (str): Human-readable description of changes
-                - changed (bool): True if file content was actually modified
-                - diff (str, optional): Unified diff showing changes made
-                - error (str, optional): Error message if operation failed
-
-        Examples:
+def _permission_request(payload: Any) -> Tuple[str, str, Any] | None:
+    """The (file_path, operation, operation_data) a payload's sub-tool asks about."""
+    file_path = os.path.abspath(payload.file_path)
+    kind = _payload_kind(payload)
+    if kind == "replacements":
+        operation_data: Dict[str, Any] = {"replacements": _replacement_dicts(payload)}
+        return file_path, "replace text in", operation_data
+    if kind == "delete_snippet":
+        return file_path, "delete snippet from", {"snippet": payload.delete_snippet}
+    if kind == "content":
+        operation_data = {"content": payload.content, "overwrite": payload.overwrite}
+        return file_path, "write", operation_data
+    return None
+
+
+_PAYLOAD_EXAMPLES = """Examples:
             >>> # Create new file with content
             >>> payload = {"file_path": "hello.py", "content": "print('Hello!')", "overwrite": true}
             >>> result = edit_file(ctx, payload)
@@ -690,137 +967,358 @@ def register_edit_file(agent):
             ...     "file_path": "main.py",
             ...     "delete_snippet": "# TODO: remove this comment"
             ... }
-            >>> result = edit_file(ctx, payload)
-
-        Best Practices:
-            - Use replacements for targeted changes (most efficient)
-            - Use content payload only for new files or complete rewrites
-            - Always check the 'success' field before assuming changes worked
-            - Review the 'diff' field to understand what changed
-            - Use delete_snippet for removing specific code blocks
-        """
-        # Handle string payload parsing (for models that send JSON strings)
-
-        parse_error_message = """Examples:
-            >>> # Create new file with content
-            >>> payload = {"file_path": "hello.py", "content": "print('Hello!')", "overwrite": true}
-            >>> result = edit_file(ctx, payload)
+            >>> result = edit_file(ctx, payload)"""
 
-            >>> # Replace text in existing file
-            >>> payload = {
-            ...     "file_path": "config.py",
-            ...     "replacements": [
-            ...         {"old_str": "debug = False", "new_str": "debug = True"}
-            ...     ]
-            ... }
-            >>> result = edit_file(ctx, payload)
+# Parse-failure messages embed the examples; build their static parts once
+_MISSING_KIND_MESSAGE = (
+    "One of 'content', 'replacements', or 'delete_snippet' must be provided in "
+    "payload. Refer to the following examples: " + _PAYLOAD_EXAMPLES
+)
+_PARSE_FAILED_SUFFIX = (
+    " - this means the tool failed to parse your inputs. "
+    "Refer to the following examples: " + _PAYLOAD_EXAMPLES
+)
 
-            >>> # Delete snippet from file
-            >>> payload = {
-            ...     "file_path": "main.py",
-            ...     "delete_snippet": "# TODO: remove this comment"
-            ... }
-            >>> result = edit_file(ctx, payload)"""
 
-        if isinstance(payload, str):
+def _coerce_payload(
+    payload: EditFilePayload | str,
+) -> Tuple[EditFilePayload | None, Dict[str, Any] | None]:
+    """Turn a tool payload (model or JSON string) into (payload, None) or (None, error)."""
+    if isinstance(payload, str):
+        try:
+            # Well-formed JSON needs neither repair nor a separate json.loads
+            payload = _PAYLOAD_JSON_ADAPTER.validate_json(payload)
+        except ValidationError:
+            pass
+    if isinstance(payload, str):
+        try:
+            # Fallback for weird models that just can't help but send json strings...
             try:
-                # Fallback for weird models that just can't help but send json strings...
+                payload_dict = json.loads(payload)
+            except json.JSONDecodeError:
+                # Only malformed JSON pays for a repair pass
                 payload_dict = json.loads(json_repair.repair_json(payload))
-                if "replacements" in payload_dict:
-                    payload = ReplacementsPayload(**payload_dict)
-                elif "delete_snippet" in payload_dict:
-                    payload = DeleteSnippetPayload(**payload_dict)
-                elif "content" in payload_dict:
-                    payload = ContentPayload(**payload_dict)
-                else:
-                    file_path = "Unknown"
-                    if "file_path" in payload_dict:
-                        file_path = payload_dict["file_path"]
-                    return {
-                        "success": False,
-                        "path": file_path,
-                        "message": f"One of 'content', 'replacements', or 'delete_snippet' must be provided in payload. Refer to the following examples: {parse_error_message}",
-                        "changed": False,
-                    }
-            except Exception as e:
-                return {
+            kind = _payload_kind(payload_dict)
+            if kind is not None:
+                payload = _PAYLOAD_VARIANTS[kind](**payload_dict)
+            else:
+                file_path = "Unknown"
+                if "file_path" in payload_dict:
+                    file_path = payload_dict["file_path"]
+                return None, {
                     "success": False,
-                    "path": "Not retrievable in Payload",
-                    "message": f"edit_file call failed: {str(e)} - this means the tool failed to parse your inputs. Refer to the following examples: {parse_error_message}",
+                    "path": file_path,
+                    "message": _MISSING_KIND_MESSAGE,
                     "changed": False,
                 }
+        except Exception as e:
+            return None, {
+                "success": False,
+                "path": "Not retrievable in Payload",
+                "message": "edit_file call failed: " + str(e) + _PARSE_FAILED_SUFFIX,
+                "changed": False,
+            }
+    return payload, None
 
-        # Call _edit_file which will extract file_path from payload and handle group_id generation
-        result = _edit_file(context, payload)
-        if "diff" in result:
-            del result["diff"]
 
-        # Trigger edit_file callbacks to enhance the result with rejection details
-        enhanced_results = on_edit_file(context, result, payload)
-        if enhanced_results:
-            # Use the first non-None enhanced result
-            for enhanced_result in enhanced_results:
-                if enhanced_result is not None:
-                    result = enhanced_result
-                    break
+def _bulk_answers(results: List[Any], count: int) -> List[PermissionAnswer | None]:
+    """Combine the per-operation answers of every bulk handler that answered.
 
-        return result
+    An operation is denied if any handler denied it and approved only if all
+    of them approved it; otherwise it is left to ``on_file_permission``.
+    """
+    batches = [r for r in results if isinstance(r, list) and len(r) == count]
+    if not batches:
+        return [None] * count
+    answers: List[PermissionAnswer | None] = []
+    for entries in zip(*batches):
+        denial = next((e for e in entries if e is not None and not e.confirmed), None)
+        if denial is not None:
+            answers.append(denial)
+        elif all(e is not None for e in entries):
+            answers.append(entries[0])
+        else:
+            answers.append(None)
+    return answers
 
 
-def register_delete_file(agent):
-    """Register only the delete_file tool."""
+def _edit_files(
+    context: RunContext,
+    payloads: List[EditFilePayload],
+    group_id: str | None = None,
+) -> List[Dict[str, Any]]:
+    """Apply several edit_file payloads behind a single permission prompt.
+
+    A ``file_permission_bulk`` handler previews the batch concurrently and
+    answers for each operation; the edits are then applied in order through
+    ``_edit_file`` with their answers. A file targeted by more than one payload
+    is left out of the batch, since its later edits could only be previewed
+    against content the earlier ones replace: those payloads, and any the
+    handlers left unanswered, are asked about one at a time, as before.
+    """
+    from code_puppy.callbacks import on_file_permission_bulk
+
+    if group_id is None:
+        group_id = generate_group_id(
+            "edit_files", str(len(payloads)), _call_id(context)
+        )
+
+    paths = Counter(os.path.abspath(payload.file_path) for payload in payloads)
+    batch: List[Tuple[int, Tuple[str, str, Any]]] = []
+    for index, payload in enumerate(payloads):
+        request = _permission_request(payload)
+        if request is not None and paths[request[0]] == 1:
+            batch.append((index, request))
+
+    answers: List[PermissionAnswer | None] = [None] * len(payloads)
+    if batch:
+        results = on_file_permission_bulk(
+            context, [request for _, request in batch], group_id
+        )
+        for (index, _), answer in zip(batch, _bulk_answers(results, len(batch))):
+            answers[index] = answer
+    return [
+        _edit_file(context, payload, group_id, answer)
+        for payload, answer in zip(payloads, answers)
+    ]
 
-    @agent.tool
-    def delete_file(context: RunContext, file_path: str = "") -> Dict[str, Any]:
-        """Safely delete files with comprehensive logging and diff generation.
-
-        This tool provides safe file deletion with automatic diff generation to show
-        exactly what content was removed. It includes proper error handling and
-        automatic retry capabilities for reliable operation.
-
-        Args:
-            context (RunContext): The PydanticAI runtime context for the agent.
-            file_path (str): Path to the file to delete. Can be relative or absolute.
-                Must be an existing regular file (not a directory).
-
-        Returns:
-            Dict[str, Any]: Operation result containing:
-                - success (bool): True if file was successfully deleted
-                - path (str): Absolute path to the deleted file
-                - message (str): Human-readable description of the operation
-                - changed (bool): True if file was actually removed
-                - error (str, optional): Error message if deletion failed
-
-        Examples:
-            >>> # Delete a specific file
-            >>> result = delete_file(ctx, "temp_file.txt")
-            >>> if result['success']:
-            ...     print(f"Deleted: {result['path']}")
-
-            >>> # Handle deletion errors
-            >>> result = delete_file(ctx, "missing.txt")
-            >>> if not result['success']:
-            ...     print(f"Error: {result.get('error', 'Unknown error')}")
-
-        Best Practices:
-            - Always verify file exists before attempting deletion
-            - Check 'success' field to confirm operation completed
-            - Use list_files first to confirm file paths
-            - Cannot delete directories (use shell commands for that)
-        """
-        # Generate group_id for delete_file tool execution
-        group_id = generate_group_id("delete_file", file_path)
-        result = _delete_file(context, file_path, message_group=group_id)
-        if "diff" in result:
-            del result["diff"]
-
-        # Trigger delete_file callbacks to enhance the result with rejection details
-        enhanced_results = on_delete_file(context, result, file_path)
-        if enhanced_results:
-            # Use the first non-None enhanced result
-            for enhanced_result in enhanced_results:
-                if enhanced_result is not None:
-                    result = enhanced_result
-                    break
 
+def _delete_file(
+    context: RunContext, file_path: str, message_group: str | None = None
+) -> Dict[str, Any]:
+    file_path = os.path.abspath(file_path)
+
+    # No additional operation data is needed for deletes
+    rejection, prepared = _file_permission(
+        context, file_path, "delete", message_group, {}
+    )
+    if rejection is not None:
+        return rejection
+
+    try:
+        if prepared is None:
+            prepared, res = _compute_edit(
+                "delete_file", file_path, build_diff=_diff_wanted()
+            )
+        if prepared is not None:
+            res = _commit_edit(
+                file_path, prepared, f"File '{file_path}' deleted successfully."
+            )
+    except FileNotFoundError:
+        # Removed by someone else after it was read; nothing to retry
+        res = {"error": f"File '{file_path}' does not exist.", "diff": ""}
+    except Exception as exc:
+        _log_error("Unhandled exception in delete_file", exc)
+        res = {"error": str(exc), "diff": ""}
+
+    diff = res.get("diff", "")
+    if diff:
+        _emit_diff_message(file_path, "delete", diff)
+    return res
+
+
+# Callback hooks that may replace a tool's result, by tool name
+_RESULT_HOOKS: Dict[str, Any] = {
+    "edit_file": on_edit_file_first,
+    "delete_file": on_delete_file_first,
+}
+
+
+def _finalize(
+    context: RunContext, tool_name: str, result: Dict[str, Any], subject: Any
+) -> Dict[str, Any]:
+    """Shape a tool result for the model: drop the diff, then let callbacks amend it.
+
+    The diff has already been shown to the user and would only cost tokens.
+    ``subject`` is what the tool's callbacks receive after the result (the
+    edit payload or the deleted path); e.g. rejection details are added here.
+    A successful no-op (nothing changed) is returned without callbacks.
+    """
+    result.pop("diff", None)
+    if result.get("success") and not result.get("changed"):
         return result
+    if has_listeners(tool_name):
+        enhanced_result = _RESULT_HOOKS[tool_name](context, result, subject)
+        if enhanced_result is not None:
+            return enhanced_result
+    return result
+
+
+def edit_file(
+    context: RunContext,
+    payload: EditFilePayload | str = "",
+) -> Dict[str, Any]:
+    """Comprehensive file editing tool supporting multiple modification strategies.
+
+    This is the primary file modification tool that supports three distinct editing
+    approaches: full content replacement, targeted text replacements, and snippet
+    deletion. It provides robust diff generation, error handling, and automatic
+    retry capabilities for reliable file operations.
+
+    Args:
+        context (RunContext): The PydanticAI runtime context for the agent.
+        payload: One of three payload types:
+
+            ContentPayload:
+                - file_path (str): Path to file
+                - content (str): Full file content to write
+                - overwrite (bool, optional): Whether to overwrite existing files.
+                  Defaults to False (safe mode).
+
+            ReplacementsPayload:
+                - file_path (str): Path to file
+                - replacements (List[Replacement]): List of text replacements where
+                  each Replacement contains:
+                  - old_str (str): Exact text to find and replace
+                  - new_str (str): Replacement text
+
+            DeleteSnippetPayload:
+                - file_path (str): Path to file
+                - delete_snippet (str): Exact text snippet to remove from file
+
+    Returns:
+        Dict[str, Any]: Operation result containing:
+            - success (bool): True if operation completed successfully
+            - path (str): Absolute path to the modified file
+            - message (str): Human-readable description of changes
+            - changed (bool): True if file content was actually modified
+            - diff (str, optional): Unified diff showing changes made
+            - error (str, optional): Error message if operation failed
+
+    Examples:
+        >>> # Create new file with content
+        >>> payload = {"file_path": "hello.py", "content": "print('Hello!')", "overwrite": true}
+        >>> result = edit_file(ctx, payload)
+
+        >>> # Replace text in existing file
+        >>> payload = {
+        ...     "file_path": "config.py",
+        ...     "replacements": [
+        ...         {"old_str": "debug = False", "new_str": "debug = True"}
+        ...     ]
+        ... }
+        >>> result = edit_file(ctx, payload)
+
+        >>> # Delete snippet from file
+        >>> payload = {
+        ...     "file_path": "main.py",
+        ...     "delete_snippet": "# TODO: remove this comment"
+        ... }
+        >>> result = edit_file(ctx, payload)
+
+    Best Practices:
+        - Use replacements for targeted changes (most efficient)
+        - Use content payload only for new files or complete rewrites
+        - Always check the 'success' field before assuming changes worked
+        - Review the 'diff' field to understand what changed
+        - Use delete_snippet for removing specific code blocks
+    """
+    payload, error = _coerce_payload(payload)
+    if error is not None:
+        return error
+
+    # Call _edit_file which will extract file_path from payload and handle group_id generation
+    result = _edit_file(context, payload)
+    return _finalize(context, "edit_file", result, payload)
+
+
+def edit_files(
+    context: RunContext,
+    payloads: List[EditFilePayload | str],
+) -> List[Dict[str, Any]]:
+    """Apply several edit_file payloads in one call, behind a single approval.
+
+    Use this instead of repeated edit_file calls for multi-file changes
+    (renames, refactors touching many files). Each payload has exactly the
+    shape edit_file accepts and is applied in order, so several edits to
+    the same file are fine.
+
+    Args:
+        context (RunContext): The PydanticAI runtime context for the agent.
+        payloads: List of ContentPayload, ReplacementsPayload or
+            DeleteSnippetPayload objects (see edit_file).
+
+    Returns:
+        List[Dict[str, Any]]: One edit_file result per payload, in order.
+            A payload that fails to parse yields an error result and does
+            not stop the others.
+
+    Examples:
+        >>> payloads = [
+        ...     {"file_path": "a.py", "replacements": [{"old_str": "foo", "new_str": "bar"}]},
+        ...     {"file_path": "b.py", "delete_snippet": "# TODO"},
+        ... ]
+        >>> results = edit_files(ctx, payloads)
+    """
+    results: List[Dict[str, Any] | None] = []
+    parsed: List[EditFilePayload] = []
+    for payload in payloads:
+        payload, error = _coerce_payload(payload)
+        results.append(error)
+        if error is None:
+            parsed.append(payload)
+
+    applied = zip(parsed, _edit_files(context, parsed))
+    for index, error in enumerate(results):
+        if error is None:
+            payload, result = next(applied)
+            results[index] = _finalize(context, "edit_file", result, payload)
+    return results
+
+
+def delete_file(context: RunContext, file_path: str = "") -> Dict[str, Any]:
+    """Safely delete files with comprehensive logging and diff generation.
+
+    This tool provides safe file deletion with automatic diff generation to show
+    exactly what content was removed. The file is removed with a single
+    unlink; failures are reported in the result rather than retried.
+
+    Args:
+        context (RunContext): The PydanticAI runtime context for the agent.
+        file_path (str): Path to the file to delete. Can be relative or absolute.
+            Must be an existing regular file (not a directory).
+
+    Returns:
+        Dict[str, Any]: Operation result containing:
+            - success (bool): True if file was successfully deleted
+            - path (str): Absolute path to the deleted file
+            - message (str): Human-readable description of the operation
+            - changed (bool): True if file was actually removed
+            - error (str, optional): Error message if deletion failed
+
+    Examples:
+        >>> # Delete a specific file
+        >>> result = delete_file(ctx, "temp_file.txt")
+        >>> if result['success']:
+        ...     print(f"Deleted: {result['path']}")
+
+        >>> # Handle deletion errors
+        >>> result = delete_file(ctx, "missing.txt")
+        >>> if not result['success']:
+        ...     print(f"Error: {result.get('error', 'Unknown error')}")
+
+    Best Practices:
+        - Always verify file exists before attempting deletion
+        - Check 'success' field to confirm operation completed
+        - Use list_files first to confirm file paths
+        - Cannot delete directories (use shell commands for that)
+    """
+    # Generate group_id for delete_file tool execution
+    group_id = generate_group_id("delete_file", file_path, _call_id(context))
+    result = _delete_file(context, file_path, message_group=group_id)
+    return _finalize(context, "delete_file", result, file_path)
+
+
+def register_edit_file(agent):
+    """Register only the edit_file tool."""
+    agent.tool(edit_file)
+
+
+def register_edit_files(agent):
+    """Register the edit_files batch tool."""
+    agent.tool(edit_files)
+
+
+def register_delete_file(agent):
+    """Register only the delete_file tool."""
+    agent.tool(delete_file)
@@ -9,6 +9,7 @@ Woof! 🐶 Here's my complete toolkit! I'm like a Swiss Army knife but way more
   - ✅ Overwrite entire files
   - ✅ Make targeted replacements (preferred method!)
   - ✅ Delete specific snippets
+- **`edit_files(payloads)`** - Batch version of edit_file for multi-file changes, approved in one go
 - **`delete_file(file_path)`** - Remove files when needed (use with caution!)
 
 # **Search & Analysis**
@@ -0,0 +1,319 @@
+"""Tests for the file permission handler plugin."""
+
+from unittest.mock import patch
+
+import pytest
+
+from code_puppy import config
+from code_puppy.plugins.file_permission_handler import register_callbacks as fph
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    """Point the config module at a throwaway puppy.cfg and reset the flag cache."""
+    cfg = tmp_path / "puppy.cfg"
+    cfg.write_text("[puppy]\nyolo_mode = false\n")
+    monkeypatch.setattr(config, "CONFIG_FILE", str(cfg))
+    monkeypatch.setattr(config, "_config_flag_cache", (None, {}))
+    return cfg
+
+
+class TestYoloMode:
+    def test_yolo_mode_skips_prompt(self, config_file):
+        with (
+            patch.object(fph, "get_yolo_mode_cached", return_value=True),
+            patch.object(fph, "get_user_approval") as mock_approval,
+        ):
+            assert fph.prompt_for_file_permission("x.py", "edit") == (True, None)
+        mock_approval.assert_not_called()
+
+
+class TestConfirmationLock:
+    def test_busy_prompt_rejects_without_prompting(self, config_file):
+        with (
+            patch.object(fph, "get_yolo_mode_cached", return_value=False),
+            patch.object(fph, "get_user_approval") as mock_approval,
+            patch.object(fph, "emit_warning") as mock_warning,
+        ):
+            with fph._FILE_CONFIRMATION_LOCK:
+                assert fph.prompt_for_file_permission("x.py", "edit") == (False, None)
+        mock_approval.assert_not_called()
+        mock_warning.assert_called_once()
+
+    def test_lock_released_after_prompt(self, config_file):
+        with (
+            patch.object(fph, "get_yolo_mode_cached", return_value=False),
+            patch.object(fph, "get_user_approval", return_value=(True, None)),
+        ):
+            assert fph.prompt_for_file_permission("x.py", "edit") == (True, None)
+        assert not fph._FILE_CONFIRMATION_LOCK.locked()
+
+
+class TestPreparedEdits:
+    def test_preview_is_handed_to_matching_operation(self, tmp_path):
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+        data = {"replacements": [{"old_str": "x = 1", "new_str": "x = 2"}]}
+
+        diff = fph._generate_preview_from_operation_data(
+            str(target), "replace text in", data
+        )
+        prepared = fph.take_prepared_edit(str(target), data)
+
+        assert prepared is not None
+        assert prepared.diff == diff
+        assert prepared.modified == "x = 2\n"
+        # Taken previews are forgotten
+        assert fph.take_prepared_edit(str(target), data) is None
+
+    def test_preview_not_reused_for_other_operation_data(self, tmp_path):
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+        data = {"snippet": "x = 1\n"}
+
+        fph._generate_preview_from_operation_data(
+            str(target), "delete snippet from", data
+        )
+
+        assert fph.take_prepared_edit(str(target), dict(data)) is None
+
+    def test_preview_discarded_when_file_changes(self, tmp_path):
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+        data = {"snippet": "x = 1\n"}
+
+        fph._generate_preview_from_operation_data(
+            str(target), "delete snippet from", data
+        )
+        target.write_text("x = 1\ny = 2\n")
+
+        assert fph.take_prepared_edit(str(target), data) is None
+
+    def test_replace_in_file_applies_preview_without_recomputing(
+        self, tmp_path, config_file
+    ):
+        from code_puppy.tools import file_modifications
+
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+
+        with (
+            patch.object(fph, "get_yolo_mode_cached", return_value=True),
+            patch(
+                "code_puppy.callbacks.on_file_permission",
+                side_effect=lambda *args: [fph.handle_file_permission(*args)],
+            ),
+            patch.object(file_modifications, "_compute_edit") as mock_compute,
+        ):
+            result = file_modifications.replace_in_file(
+                None, str(target), [{"old_str": "x = 1", "new_str": "x = 2"}]
+            )
+
+        mock_compute.assert_not_called()
+        assert result["success"] is True
+        assert "+x = 2" in result["diff"]
+        assert target.read_text() == "x = 2\n"
+
+    def test_identical_write_has_no_preview(self, tmp_path):
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+
+        assert (
+            fph._preview("write", str(target), content="x = 1\n", overwrite=True)
+            is None
+        )
+        assert fph._preview("write", str(target), content="x = 2\n", overwrite=True)
+
+    def test_yolo_preview_skips_diff_when_suppressed(self, tmp_path, config_file):
+        config_file.write_text(
+            "[puppy]\nyolo_mode = true\nsuppress_edit_diffs = true\n"
+        )
+        target = tmp_path / "a.py"
+
+        preview = fph._preview("write", str(target), content="x = 1\n")
+
+        assert preview is not None
+        assert preview.diff == ""
+        assert preview.modified == "x = 1\n"
+
+
+class TestBulkPermission:
+    def _patched(self, approval):
+        return (
+            patch.object(fph, "get_yolo_mode_cached", return_value=False),
+            patch.object(fph, "get_user_approval", return_value=approval),
+            patch(
+                "code_puppy.callbacks.on_file_permission",
+                side_effect=lambda *args: [fph.handle_file_permission(*args)],
+            ),
+            patch(
+                "code_puppy.callbacks.on_file_permission_bulk",
+                side_effect=lambda *args: [fph.handle_file_permission_bulk(*args)],
+            ),
+        )
+
+    def _payloads(self, tmp_path):
+        from code_puppy.tools import file_modifications as fm
+
+        (tmp_path / "a.py").write_text("x = 1\n")
+        (tmp_path / "b.py").write_text("y = 1\n")
+        return [
+            fm.ReplacementsPayload(
+                file_path=str(tmp_path / "a.py"),
+                replacements=[{"old_str": "x = 1", "new_str": "x = 2"}],
+            ),
+            fm.DeleteSnippetPayload(
+                file_path=str(tmp_path / "b.py"), delete_snippet="y = 1\n"
+            ),
+            fm.ContentPayload(file_path=str(tmp_path / "c.py"), content="z = 1\n"),
+        ]
+
+    def test_batch_is_approved_with_one_prompt(self, tmp_path, config_file):
+        from code_puppy.tools import file_modifications as fm
+
+        payloads = self._payloads(tmp_path)
+        yolo, approval, single, bulk = self._patched((True, None))
+        with yolo, approval as mock_approval, single, bulk:
+            results = fm._edit_files(None, payloads)
+
+        mock_approval.assert_called_once()
+        preview = mock_approval.call_args.kwargs["preview"]
+        assert "+x = 2" in preview and "-y = 1" in preview and "+z = 1" in preview
+        assert all(result["success"] for result in results)
+        assert (tmp_path / "a.py").read_text() == "x = 2\n"
+        assert (tmp_path / "b.py").read_text() == ""
+        assert (tmp_path / "c.py").read_text() == "z = 1\n"
+
+    def test_denied_batch_changes_nothing(self, tmp_path, config_file):
+        from code_puppy.tools import file_modifications as fm
+
+        payloads = self._payloads(tmp_path)
+        yolo, approval, single, bulk = self._patched((False, None))
+        with yolo, approval as mock_approval, single, bulk:
+            results = fm._edit_files(None, payloads)
+
+        mock_approval.assert_called_once()
+        assert [result["success"] for result in results] == [False, False, False]
+        assert (tmp_path / "a.py").read_text() == "x = 1\n"
+        assert not (tmp_path / "c.py").exists()
+
+    def test_denial_feedback_reaches_every_result(self, tmp_path, config_file):
+        from code_puppy.tools import file_modifications as fm
+
+        payloads = self._payloads(tmp_path)
+        yolo, approval, single, bulk = self._patched((False, "use tabs"))
+        with yolo, approval, single, bulk:
+            results = fm._edit_files(None, payloads)
+
+        assert [result["user_feedback"] for result in results] == ["use tabs"] * 3
+
+    def test_same_file_payloads_are_asked_about_one_at_a_time(
+        self, tmp_path, config_file
+    ):
+        from code_puppy.tools import file_modifications as fm
+
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+        payloads = [
+            fm.ReplacementsPayload(
+                file_path=str(target),
+                replacements=[{"old_str": "x = 1", "new_str": "x = 2"}],
+            ),
+            fm.ReplacementsPayload(
+                file_path=str(target),
+                replacements=[{"old_str": "x = 2", "new_str": "rm_everything = True"}],
+            ),
+        ]
+        yolo, approval, single, bulk = self._patched((True, None))
+        with yolo, approval as mock_approval, single, bulk as mock_bulk:
+            results = fm._edit_files(None, payloads)
+
+        mock_bulk.assert_not_called()
+        previews = [call.kwargs["preview"] for call in mock_approval.call_args_list]
+        assert len(previews) == 2
+        assert "+x = 2" in previews[0]
+        # The second edit is shown against the file the first one produced
+        assert "-x = 2" in previews[1] and "+rm_everything = True" in previews[1]
+        assert all(result["success"] for result in results)
+        assert target.read_text() == "rm_everything = True\n"
+
+    def test_operation_without_preview_is_not_approved_in_bulk(
+        self, tmp_path, config_file
+    ):
+        from code_puppy.tools import file_modifications as fm
+
+        payloads = self._payloads(tmp_path)
+        payloads[0] = fm.ReplacementsPayload(
+            file_path=str(tmp_path / "a.py"),
+            replacements=[{"old_str": "missing", "new_str": "x = 2"}],
+        )
+        yolo, approval, single, bulk = self._patched((True, None))
+        with yolo, approval as mock_approval, single, bulk:
+            fm._edit_files(None, payloads)
+
+        bulk_call, single_call = mock_approval.call_args_list
+        assert str(tmp_path / "a.py") not in bulk_call.kwargs["content"].plain
+        assert str(tmp_path / "a.py") in single_call.kwargs["content"].plain
+
+    def test_preview_of_changed_file_is_asked_about_again(self, tmp_path, config_file):
+        from code_puppy.tools import file_modifications as fm
+
+        target = tmp_path / "a.py"
+        target.write_text("x = 1\n")
+        payload = fm.ReplacementsPayload(
+            file_path=str(target),
+            replacements=[{"old_str": "x = 1", "new_str": "x = 2"}],
+        )
+        approved = fm.PermissionAnswer(
+            True, preview=fph._compute_preview(*fm._permission_request(payload))
+        )
+        target.write_text("x = 1\ny = 1\n")
+
+        yolo, approval, single, _ = self._patched((True, None))
+        with yolo, approval as mock_approval, single:
+            result = fm._edit_file(None, payload, "group", approved)
+
+        mock_approval.assert_called_once()
+        assert result["success"] is True
+        assert target.read_text() == "x = 2\ny = 1\n"
+
+    @pytest.mark.parametrize("yolo", [True, False])
+    def test_bulk_approval_does_not_bypass_other_handlers(
+        self, tmp_path, config_file, yolo
+    ):
+        from code_puppy import callbacks
+        from code_puppy.tools import file_modifications as fm
+
+        denied = []
+
+        def deny_all(context, file_path, *args):
+            denied.append(file_path)
+            return False
+
+        added = [
+            (phase, func)
+            for phase, func in (
+                ("file_permission", fph.handle_file_permission),
+                ("file_permission_bulk", fph.handle_file_permission_bulk),
+                ("file_permission", deny_all),
+            )
+            if func not in callbacks.get_callbacks(phase)
+        ]
+        for phase, func in added:
+            callbacks.register_callback(phase, func)
+        payloads = self._payloads(tmp_path)
+        try:
+            with (
+                patch.object(fph, "get_yolo_mode_cached", return_value=yolo),
+                patch.object(fph, "get_user_approval", return_value=(True, None)),
+            ):
+                results = fm._edit_files(None, payloads)
+        finally:
+            for phase, func in added:
+                callbacks.unregister_callback(phase, func)
+
+        assert len(denied) == 3
+        assert not any(result["success"] for result in results)
+        assert (tmp_path / "a.py").read_text() == "x = 1\n"
+        assert (tmp_path / "b.py").read_text() == "y = 1\n"
+        assert not (tmp_path / "c.py").exists()
@@ -7,9 +7,17 @@ from code_puppy.callbacks import (
     clear_callbacks,
     count_callbacks,
     get_callbacks,
+    has_listeners,
     on_custom_command,
+    on_delete_file,
+    on_delete_file_first,
     on_edit_file,
+    on_edit_file_first,
+    on_file_permission,
     on_load_model_config,
+    on_load_prompt,
+    on_run_shell_command,
+    on_shutdown,
     on_startup,
     register_callback,
     unregister_callback,
@@ -275,3 +283,227 @@ class TestCallbacksExtended:
         assert len(callbacks1) == 2
         assert len(callbacks2) == 1
         assert len(get_callbacks("startup")) == 1
+
+    def test_get_callbacks_reflects_registration_changes(self):
+        """Test that cached snapshots are invalidated on register/unregister."""
+
+        def callback1():
+            return "1"
+
+        def callback2():
+            return "2"
+
+        register_callback("startup", callback1)
+        assert get_callbacks("startup") == [callback1]
+
+        register_callback("startup", callback2)
+        assert get_callbacks("startup") == [callback1, callback2]
+
+        unregister_callback("startup", callback1)
+        assert get_callbacks("startup") == [callback2]
+
+        clear_callbacks("startup")
+        assert get_callbacks("startup") == []
+
+    def test_unregistered_phase_stops_dispatching(self):
+        """Test that a phase emptied by unregister no longer dispatches."""
+        calls = []
+
+        def test_callback():
+            calls.append("called")
+
+        register_callback("load_model_config", test_callback)
+        assert on_load_model_config() == [None]
+
+        unregister_callback("load_model_config", test_callback)
+        assert on_load_model_config() == []
+        assert calls == ["called"]
+
+    @pytest.mark.asyncio
+    async def test_async_callbacks_run_concurrently(self):
+        """Test coroutine callbacks in a phase are awaited together, in order."""
+        second_started = asyncio.Event()
+
+        async def first_callback():
+            # Would deadlock if the callbacks were awaited one after another
+            await asyncio.wait_for(second_started.wait(), timeout=1)
+            return "first"
+
+        async def second_callback():
+            second_started.set()
+            return "second"
+
+        def failing_callback():
+            raise Exception("Test error")
+
+        register_callback("startup", first_callback)
+        register_callback("startup", failing_callback)
+        register_callback("startup", second_callback)
+
+        results = await on_startup()
+
+        assert results == ["first", None, "second"]
+
+    @pytest.mark.asyncio
+    async def test_shutdown_callbacks_run_sequentially(self):
+        """Test shutdown callbacks are awaited in registration order."""
+        order = []
+
+        async def slow_callback():
+            await asyncio.sleep(0.01)
+            order.append("slow")
+
+        async def fast_callback():
+            order.append("fast")
+
+        register_callback("shutdown", slow_callback)
+        register_callback("shutdown", fast_callback)
+
+        await on_shutdown()
+
+        assert order == ["slow", "fast"]
+
+    @pytest.mark.asyncio
+    async def test_plain_callable_returning_coroutine_is_awaited(self):
+        """Test non-async callables that return coroutines are still awaited."""
+
+        async def async_impl():
+            return "from_coroutine"
+
+        def wrapper():
+            return async_impl()
+
+        register_callback("startup", wrapper)
+
+        assert await on_startup() == ["from_coroutine"]
+        assert await on_startup() == ["from_coroutine"]
+
+    @pytest.mark.asyncio
+    async def test_callable_returning_coroutine_only_sometimes_is_awaited(self):
+        """Test a coroutine is awaited even if the first call returned a value."""
+
+        async def block():
+            return {"blocked": True}
+
+        def maybe_block(context, command, *args):
+            return block() if command == "rm -rf /" else None
+
+        register_callback("run_shell_command", maybe_block)
+
+        assert await on_run_shell_command(None, "ls") == [None]
+        assert await on_run_shell_command(None, "rm -rf /") == [{"blocked": True}]
+
+    def test_sync_only_phase_runs_async_callback_from_worker_thread(self):
+        """Test async callbacks of file-operation phases run outside a loop."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        async def audit(*args):
+            return "ran"
+
+        for phase in ("edit_file", "delete_file", "file_permission"):
+            register_callback(phase, audit)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(on_delete_file, "a.py").result() == ["ran"]
+            assert executor.submit(
+                on_file_permission, None, "a.py", "edit"
+            ).result() == ["ran"]
+
+    def test_sync_only_phase_dispatch(self):
+        """Test sync-only phases keep results in order and isolate failures."""
+
+        def failing_callback(path):
+            raise RuntimeError("boom")
+
+        register_callback("delete_file", lambda path: f"first:{path}")
+        register_callback("delete_file", failing_callback)
+        register_callback("delete_file", lambda path: f"third:{path}")
+
+        with patch("code_puppy.callbacks.logger") as mock_logger:
+            results = on_delete_file("a.py")
+
+        assert results == ["first:a.py", None, "third:a.py"]
+        mock_logger.error.assert_called_once()
+
+    def test_sync_only_phase_runs_returned_coroutine(self):
+        """Test a plain permission callback returning a coroutine is awaited."""
+
+        async def deny():
+            return False
+
+        register_callback("file_permission", lambda *args: deny())
+
+        assert on_file_permission(None, "a.py", "edit") == [False]
+
+    @pytest.mark.asyncio
+    async def test_permission_coroutine_in_running_loop_denies(self):
+        """Test an unrunnable permission coroutine fails closed, not open."""
+        import warnings
+
+        async def allow():
+            return True
+
+        register_callback("file_permission", lambda *args: allow())
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            assert on_file_permission(None, "a.py", "edit") == [False]
+
+    def test_first_result_sync_phase_dispatch(self):
+        """Test first-result dispatch skips None and failures but runs everyone."""
+        seen = []
+
+        def failing_callback(context, result, payload):
+            raise RuntimeError("boom")
+
+        def recording_callback(context, result, payload):
+            seen.append(payload)
+            return {"third": payload}
+
+        assert on_edit_file_first(None, {}, "a.py") is None
+        register_callback("edit_file", lambda context, result, payload: None)
+        register_callback("edit_file", failing_callback)
+        register_callback(
+            "edit_file", lambda context, result, payload: {**result, "second": payload}
+        )
+        register_callback("edit_file", recording_callback)
+
+        with patch("code_puppy.callbacks.logger") as mock_logger:
+            first = on_edit_file_first(None, {"success": True}, "a.py")
+
+        assert first == {"success": True, "second": "a.py"}
+        assert seen == ["a.py"]
+        mock_logger.error.assert_called_once()
+        assert on_delete_file_first(None, {}, "a.py") is None
+
+    def test_has_listeners_tracks_registration(self):
+        """Test has_listeners follows register/unregister and unknown phases."""
+
+        def callback(path):
+            return path
+
+        assert has_listeners("edit_file") is False
+        register_callback("edit_file", callback)
+        assert has_listeners("edit_file") is True
+        assert has_listeners("delete_file") is False
+        unregister_callback("edit_file", callback)
+        assert has_listeners("edit_file") is False
+        assert has_listeners("not_a_phase") is False
+
+    def test_zero_arg_sync_phase_dispatch(self):
+        """Test zero-argument sync phases run plain, failing and async callbacks."""
+
+        def failing_callback():
+            raise RuntimeError("boom")
+
+        async def async_callback():
+            return "async_rules"
+
+        register_callback("load_prompt", lambda: "rules")
+        register_callback("load_prompt", failing_callback)
+        register_callback("load_prompt", async_callback)
+
+        with patch("code_puppy.callbacks.logger") as mock_logger:
+            results = on_load_prompt()
+
+        assert results == ["rules", None, "async_rules"]
+        mock_logger.error.assert_called_once()
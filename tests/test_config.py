@@ -502,6 +502,65 @@ class TestGetYoloMode:
         mock_get_value.assert_called_once_with("yolo_mode")
 
 
+class TestCachedConfigFlags:
+    @pytest.fixture
+    def config_file(self, tmp_path, monkeypatch):
+        cfg = tmp_path / "puppy.cfg"
+        cfg.write_text("[puppy]\nyolo_mode = false\n")
+        monkeypatch.setattr(cp_config, "CONFIG_FILE", str(cfg))
+        monkeypatch.setattr(cp_config, "_config_flag_cache", (None, {}))
+        return cfg
+
+    def test_reads_config_once_while_unchanged(self, config_file):
+        with patch.object(cp_config, "get_yolo_mode", return_value=False) as mock_yolo:
+            assert cp_config.get_yolo_mode_cached() is False
+            assert cp_config.get_yolo_mode_cached() is False
+        mock_yolo.assert_called_once()
+
+    def test_suppress_edit_diffs_read_once_while_unchanged(self, config_file):
+        with patch.object(
+            cp_config, "get_suppress_edit_diffs", return_value=True
+        ) as mock_suppress:
+            assert cp_config.get_suppress_edit_diffs_cached() is True
+            assert cp_config.get_suppress_edit_diffs_cached() is True
+        mock_suppress.assert_called_once()
+
+    def test_flags_are_cached_independently(self, config_file):
+        config_file.write_text(
+            "[puppy]\nyolo_mode = true\nsuppress_edit_diffs = false\n"
+        )
+        assert cp_config.get_yolo_mode_cached() is True
+        assert cp_config.get_suppress_edit_diffs_cached() is False
+
+    def test_rereads_config_after_change(self, config_file):
+        assert cp_config.get_yolo_mode_cached() is False
+
+        config_file.write_text("[puppy]\nyolo_mode = true\n")
+        st = os.stat(config_file)
+        os.utime(config_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        assert cp_config.get_yolo_mode_cached() is True
+
+    def test_rereads_config_after_set_config_value(self, config_file):
+        frozen = os.stat(config_file)
+        with (
+            patch.object(cp_config.os, "stat", return_value=frozen),
+            patch.object(cp_config, "get_yolo_mode", return_value=False) as mock_yolo,
+        ):
+            cp_config.get_yolo_mode_cached()
+            cp_config.set_config_value("yolo_mode", "true")
+            cp_config.get_yolo_mode_cached()
+        # File stat looks unchanged, but the config generation moved on
+        assert mock_yolo.call_count == 2
+
+    def test_missing_config_falls_back_to_uncached(self, config_file, monkeypatch):
+        monkeypatch.setattr(cp_config, "CONFIG_FILE", str(config_file) + ".missing")
+        with patch.object(cp_config, "get_yolo_mode", return_value=True) as mock_yolo:
+            assert cp_config.get_yolo_mode_cached() is True
+            assert cp_config.get_yolo_mode_cached() is True
+        assert mock_yolo.call_count == 2
+
+
 class TestCommandHistory:
     @patch("os.path.isfile")
     @patch("pathlib.Path.touch")
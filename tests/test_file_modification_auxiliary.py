@@ -1,3 +1,8 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic import ValidationError
+
 from code_puppy.tools import file_modifications
 
 
@@ -74,3 +79,332 @@ def test_write_to_file_binary_content(tmp_path):
         assert "success" in res or "error" in res
     except Exception:
         assert True
+
+
+def test_write_to_file_identical_content_is_noop(tmp_path):
+    path = tmp_path / "same.txt"
+    path.write_text("woof\n")
+    res = file_modifications._write_to_file(None, str(path), "woof\n", overwrite=True)
+    assert res["success"]
+    assert res["changed"] is False
+    assert res["diff"] == ""
+
+
+def test_identical_write_is_not_put_to_permission_handlers(tmp_path):
+    path = tmp_path / "same.txt"
+    path.write_text("woof\n")
+    with patch("code_puppy.callbacks.on_file_permission") as mock_permission:
+        res = file_modifications.write_to_file(None, str(path), "woof\n", True)
+    mock_permission.assert_not_called()
+    assert res["success"]
+    assert res["changed"] is False
+
+
+def test_write_to_file_same_size_different_content(tmp_path):
+    path = tmp_path / "same_size.txt"
+    path.write_text("woof\n")
+    res = file_modifications._write_to_file(None, str(path), "bark\n", overwrite=True)
+    assert res["changed"] is True
+    assert path.read_text() == "bark\n"
+
+
+def test_apply_replacements_consecutive_fuzzy_edits():
+    original = "def bark():\n    return 'woof'\n\ndef sit():\n    return 'ok'\n"
+    modified, no_match = file_modifications._apply_replacements(
+        original,
+        [
+            {
+                "old_str": "def bark():\n    return 'woof' ",
+                "new_str": "def bark():\n    return 'WOOF'",
+            },
+            {
+                "old_str": "def sit():\n    return 'ok' ",
+                "new_str": "def sit():\n    return 'OK'",
+            },
+        ],
+    )
+    assert no_match is None
+    assert modified == "def bark():\n    return 'WOOF'\n\ndef sit():\n    return 'OK'\n"
+
+
+def test_apply_replacements_reports_failed_snippet():
+    modified, no_match = file_modifications._apply_replacements(
+        "alpha\nbeta\n", [{"old_str": "completely different", "new_str": "x"}]
+    )
+    assert modified == "alpha\nbeta\n"
+    assert no_match["received"] == "completely different"
+    assert no_match["jw_score"] < 0.95
+
+
+def test_parse_diff_lines_types_and_numbers():
+    diff = "--- a/f.py\n+++ b/f.py\n@@ -3,2 +3,2 @@\n keep\n-old\n+new\n"
+    lines = file_modifications._parse_diff_lines(diff)
+    assert [(dl.type, dl.line_number, dl.content) for dl in lines] == [
+        ("context", 1, "--- a/f.py"),
+        ("context", 1, "+++ b/f.py"),
+        ("context", 2, "@@ -3,2 +3,2 @@"),
+        ("context", 3, " keep"),
+        ("remove", 4, "old"),
+        ("add", 5, "new"),
+    ]
+
+
+def test_apply_replacements_fuzzy_keeps_line_endings():
+    original = "first\r\nsecond line here\r\nthird"
+    modified, no_match = file_modifications._apply_replacements(
+        original, [{"old_str": "second lime here", "new_str": "2nd\nline"}]
+    )
+    assert no_match is None
+    assert modified == "first\r\n2nd\r\nline\r\nthird"
+
+
+def test_apply_replacements_fuzzy_at_unterminated_last_line():
+    modified, no_match = file_modifications._apply_replacements(
+        "alpha\nbeta gamma delta",
+        [{"old_str": "beta gamma delto", "new_str": "omega\n"}],
+    )
+    assert no_match is None
+    assert modified == "alpha\nomega"
+
+
+def test_stat_regular_only_accepts_files(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("woof")
+    assert file_modifications._stat_regular(str(path)).st_size == 4
+    assert file_modifications._stat_regular(str(tmp_path)) is None
+    assert file_modifications._stat_regular(str(tmp_path / "missing")) is None
+
+
+def test_replace_in_file_preserves_crlf(tmp_path):
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(b"one\r\ntwo\r\n")
+    res = file_modifications._replace_in_file(
+        None, str(path), [{"old_str": "two", "new_str": "three"}]
+    )
+    assert res["success"]
+    assert path.read_bytes() == b"one\r\nthree\r\n"
+
+
+def test_delete_snippet_lf_snippet_in_crlf_file(tmp_path):
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(b"keep\r\na\r\nb\r\nend\r\n")
+    res = file_modifications._delete_snippet_from_file(None, str(path), "a\nb\n")
+    assert res["success"]
+    assert path.read_bytes() == b"keep\r\nend\r\n"
+
+
+def test_replace_lf_multiline_snippet_in_crlf_file(tmp_path):
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(b"one\r\ntwo\r\nthree\r\n")
+    res = file_modifications._replace_in_file(
+        None, str(path), [{"old_str": "one\ntwo\n", "new_str": "1\n2\n"}]
+    )
+    assert res["success"]
+    assert path.read_bytes() == b"1\r\n2\r\nthree\r\n"
+
+
+def test_match_line_endings_follows_dominant_style():
+    match = file_modifications._match_line_endings
+    assert match("a\nb", "x\r\ny\r\n") == "a\r\nb"
+    assert match("a\r\nb", "x\r\ny\r\n") == "a\r\nb"
+    assert match("a\nb", "x\ny\nz\r\n") == "a\nb"
+    text = "no newline"
+    assert match(text, "x\r\n") is text
+
+
+def test_write_to_file_without_diff(tmp_path):
+    path = tmp_path / "big.txt"
+    res = file_modifications._write_to_file(
+        None, str(path), "woof\n" * 1000, overwrite=False, build_diff=False
+    )
+    assert res["success"] and res["changed"]
+    assert res["diff"] == ""
+    assert path.read_text() == "woof\n" * 1000
+
+
+def test_payload_json_adapter_picks_variant_by_key():
+    adapter = file_modifications._PAYLOAD_JSON_ADAPTER
+    both = '{"file_path": "a.py", "content": "x", "replacements": []}'
+    assert isinstance(
+        adapter.validate_json(both), file_modifications.ReplacementsPayload
+    )
+    snippet = '{"file_path": "a.py", "delete_snippet": "x"}'
+    assert adapter.validate_json(snippet).delete_snippet == "x"
+    content = '{"file_path": "a.py", "content": "x"}'
+    assert adapter.validate_json(content).overwrite is False
+    with pytest.raises(ValidationError):
+        adapter.validate_json('{"file_path": "a.py"}')
+
+
+def test_payload_kind_matches_dicts_and_models():
+    kind = file_modifications._payload_kind
+    assert kind({"content": "x", "delete_snippet": "y"}) == "delete_snippet"
+    assert kind({"file_path": "a.py"}) is None
+    assert kind(["content"]) is None
+    model = file_modifications.ContentPayload(file_path="a.py", content="x")
+    assert kind(model) == "content"
+    assert set(file_modifications._EDIT_HANDLERS) == set(
+        file_modifications._PAYLOAD_VARIANTS
+    )
+
+
+def test_permission_denied_ignores_abstaining_handlers():
+    denied = file_modifications._permission_denied
+    assert denied([]) is False
+    assert denied([None, True]) is False
+    assert denied([True, None, False]) is True
+
+
+def test_bulk_answers_combine_handlers_per_operation():
+    answer = file_modifications.PermissionAnswer
+    approve, deny = answer(True), answer(False, "no")
+    merged = file_modifications._bulk_answers(
+        [[approve, approve, approve], None, [approve, deny, None], [approve]], 3
+    )
+    # Any denial wins; an approval needs every answering handler
+    assert merged == [approve, deny, None]
+    assert file_modifications._bulk_answers([None, True], 2) == [None, None]
+
+
+def test_edit_files_applies_each_payload_with_its_bulk_answer(tmp_path):
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    a.write_text("foo\n")
+    b.write_text("foo\n")
+    payloads = [
+        file_modifications.ReplacementsPayload(
+            file_path=str(path), replacements=[{"old_str": "foo", "new_str": "bar"}]
+        )
+        for path in (a, b)
+    ]
+
+    def bulk(context, operations, message_group):
+        preview, _ = file_modifications._compute_edit(
+            "replace", operations[0][0], replacements=operations[0][2]["replacements"]
+        )
+        return [
+            [
+                file_modifications.PermissionAnswer(True, preview=preview),
+                file_modifications.PermissionAnswer(False, "leave b alone"),
+            ]
+        ]
+
+    with (
+        patch(
+            "code_puppy.callbacks.on_file_permission", return_value=[True]
+        ) as mock_single,
+        patch("code_puppy.callbacks.on_file_permission_bulk", side_effect=bulk),
+    ):
+        results = file_modifications._edit_files(None, payloads)
+
+    # The approval is still put to the per-file handlers; the denial is final
+    mock_single.assert_called_once()
+    answer = mock_single.call_args.args[5][file_modifications.BULK_ANSWER_KEY]
+    assert answer.confirmed is True
+    assert results[0]["success"] is True
+    assert results[1]["user_feedback"] == "leave b alone"
+    assert a.read_text() == "bar\n"
+    assert b.read_text() == "foo\n"
+
+
+def test_edit_files_tool_applies_batch_and_reports_bad_payloads(tmp_path):
+    agent = MagicMock()
+    agent.tool.side_effect = lambda func: func
+    file_modifications.register_edit_files(agent)
+    edit_files = agent.tool.call_args[0][0]
+
+    path = tmp_path / "a.txt"
+    path.write_text("foo\n")
+    payloads = [
+        f'{{"file_path": "{path}", "replacements": [{{"old_str": "foo", "new_str": "bar"}}]}}',
+        '{"file_path": "nowhere.txt"}',
+        file_modifications.ContentPayload(file_path=str(path), content="baz\n"),
+    ]
+    with (
+        patch("code_puppy.callbacks.on_file_permission", return_value=[True]),
+        patch("code_puppy.callbacks.on_file_permission_bulk", return_value=[]),
+    ):
+        results = edit_files(None, payloads)
+
+    assert [r["success"] for r in results] == [True, False, False]
+    assert results[1]["path"] == "nowhere.txt"
+    assert results[1]["message"] == file_modifications._MISSING_KIND_MESSAGE
+    assert "exists" in results[2]["message"]
+    assert all("diff" not in r for r in results)
+    assert path.read_text() == "bar\n"
+
+
+def test_edit_files_tool_respects_denying_permission_handler(tmp_path):
+    from code_puppy import callbacks
+    from code_puppy.plugins.file_permission_handler import register_callbacks as fph
+
+    agent = MagicMock()
+    agent.tool.side_effect = lambda func: func
+    file_modifications.register_edit_files(agent)
+    edit_files = agent.tool.call_args[0][0]
+
+    def deny_all(*args):
+        return False
+
+    added = [
+        (phase, func)
+        for phase, func in (
+            ("file_permission", fph.handle_file_permission),
+            ("file_permission_bulk", fph.handle_file_permission_bulk),
+            ("file_permission", deny_all),
+        )
+        if func not in callbacks.get_callbacks(phase)
+    ]
+    for phase, func in added:
+        callbacks.register_callback(phase, func)
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    a.write_text("hello\n")
+    payloads = [
+        file_modifications.ReplacementsPayload(
+            file_path=str(a), replacements=[{"old_str": "hello", "new_str": "HELLO"}]
+        ),
+        file_modifications.ContentPayload(file_path=str(b), content="x\n"),
+    ]
+    try:
+        # Yolo mode approves the whole batch in bulk without a prompt
+        with patch.object(fph, "get_yolo_mode_cached", return_value=True):
+            results = edit_files(None, payloads)
+    finally:
+        for phase, func in added:
+            callbacks.unregister_callback(phase, func)
+
+    assert all(result.get("user_rejection") for result in results)
+    assert a.read_text() == "hello\n"
+    assert not b.exists()
+
+
+def test_coerce_payload_reports_invalid_payload():
+    payload, error = file_modifications._coerce_payload(
+        '{"file_path": "a.py", "content": 5}'
+    )
+    assert payload is None
+    assert error["message"].startswith("edit_file call failed: ")
+    assert error["message"].endswith(file_modifications._PARSE_FAILED_SUFFIX)
+
+
+def test_finalize_drops_diff_and_applies_callback_result():
+    from code_puppy.callbacks import register_callback, unregister_callback
+
+    result = {"success": False, "path": "a.py", "diff": "-x\n+y\n"}
+    assert file_modifications._finalize(None, "edit_file", result, None) == {
+        "success": False,
+        "path": "a.py",
+    }
+
+    def annotate(context, res, file_path):
+        return {**res, "note": f"kept {file_path}"}
+
+    register_callback("delete_file", annotate)
+    try:
+        finalized = file_modifications._finalize(
+            None, "delete_file", {"success": False, "diff": "x"}, "a.py"
+        )
+        noop = {"success": True, "changed": False}
+        assert file_modifications._finalize(None, "delete_file", noop, "a.py") is noop
+    finally:
+        unregister_callback("delete_file", annotate)
+    assert finalized == {"success": False, "note": "kept a.py"}
@@ -10,7 +10,12 @@ from unittest.mock import MagicMock, patch
 # Add the project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from code_puppy.callbacks import on_file_permission
+from code_puppy.callbacks import (
+    clear_callbacks,
+    get_callbacks,
+    on_file_permission,
+    register_callback,
+)
 from code_puppy.tools.file_modifications import (
     _delete_file,
     delete_snippet_from_file,
@@ -37,7 +42,6 @@ class TestFilePermissions(unittest.TestCase):
 
     def test_prompt_for_file_permission_granted(self):
         """Test that permission is granted when user enters 'y'."""
-        from code_puppy.callbacks import _callbacks
 
         # Create a mock callback that returns True
         def mock_callback(
@@ -51,8 +55,9 @@ class TestFilePermissions(unittest.TestCase):
             return True
 
         # Register the mock callback
-        original_callbacks = _callbacks["file_permission"].copy()
-        _callbacks["file_permission"] = [mock_callback]
+        original_callbacks = get_callbacks("file_permission")
+        clear_callbacks("file_permission")
+        register_callback("file_permission", mock_callback)
 
         try:
             result = on_file_permission(None, self.test_file, "edit")
@@ -60,11 +65,12 @@ class TestFilePermissions(unittest.TestCase):
             self.assertEqual(result, [True])
         finally:
             # Restore original callbacks
-            _callbacks["file_permission"] = original_callbacks
+            clear_callbacks("file_permission")
+            for callback in original_callbacks:
+                register_callback("file_permission", callback)
 
     def test_prompt_for_file_permission_denied(self):
         """Test that permission is denied when user enters 'n'."""
-        from code_puppy.callbacks import _callbacks
 
         # Create a mock callback that returns False
         def mock_callback(
@@ -78,8 +84,9 @@ class TestFilePermissions(unittest.TestCase):
             return False
 
         # Register the mock callback
-        original_callbacks = _callbacks["file_permission"].copy()
-        _callbacks["file_permission"] = [mock_callback]
+        original_callbacks = get_callbacks("file_permission")
+        clear_callbacks("file_permission")
+        register_callback("file_permission", mock_callback)
 
         try:
             result = on_file_permission(None, self.test_file, "edit")
@@ -87,22 +94,24 @@ class TestFilePermissions(unittest.TestCase):
             self.assertEqual(result, [False])
         finally:
             # Restore original callbacks
-            _callbacks["file_permission"] = original_callbacks
+            clear_callbacks("file_permission")
+            for callback in original_callbacks:
+                register_callback("file_permission", callback)
 
     def test_prompt_for_file_permission_no_plugins(self):
         """Test that permission is automatically granted when no plugins registered."""
         # Temporarily unregister plugins
-        from code_puppy.callbacks import _callbacks
-
-        original_callbacks = _callbacks["file_permission"].copy()
-        _callbacks["file_permission"] = []
+        original_callbacks = get_callbacks("file_permission")
+        clear_callbacks("file_permission")
 
         try:
             result = on_file_permission(None, self.test_file, "edit")
             self.assertEqual(result, [])  # Should return empty list when no plugins
         finally:
             # Restore callbacks
-            _callbacks["file_permission"] = original_callbacks
+            clear_callbacks("file_permission")
+            for callback in original_callbacks:
+                register_callback("file_permission", callback)
 
     @patch("code_puppy.callbacks.on_file_permission")
     def test_write_to_file_with_permission_denied(self, mock_permission):
@@ -196,6 +205,22 @@ class TestFilePermissions(unittest.TestCase):
         # Verify file still exists
         self.assertTrue(os.path.exists(self.test_file))
 
+    @patch("code_puppy.callbacks.on_file_permission")
+    def test_delete_file_vanished_before_unlink(self, mock_permission):
+        """Test _delete_file when the file disappears between read and unlink."""
+        mock_permission.return_value = [True]
+
+        with (
+            patch("code_puppy.tools.file_modifications.os.remove") as mock_remove,
+            patch("code_puppy.tools.file_modifications._log_error") as mock_log,
+        ):
+            mock_remove.side_effect = FileNotFoundError(self.test_file)
+            result = _delete_file(MagicMock(), self.test_file)
+
+        self.assertIn("does not exist", result["error"])
+        mock_remove.assert_called_once()
+        mock_log.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -315,6 +315,26 @@ class TestFindBestWindow:
         assert span == (1, 2), f"Expected best match at (1, 2), got {span}"
         assert score > 0.99, f"Expected near-perfect score, got {score}"
 
+    def test_prefers_first_of_equally_good_windows(self):
+        """Test ties between windows resolve to the earliest one."""
+        haystack = ["y = 2", "x = 1", "z = 3", "x = 1"]
+
+        common_module.console = MagicMock()
+        span, score = _find_best_window(haystack, "x = 1")
+
+        assert span == (1, 2)
+        assert score == 1.0
+
+    def test_reports_best_score_below_threshold(self):
+        """Test a poor best match still reports its span and score."""
+        haystack = ["alpha", "omega", "delta"]
+
+        common_module.console = MagicMock()
+        span, score = _find_best_window(haystack, "deltx")
+
+        assert span == (2, 3)
+        assert 0 < score < 0.95
+
 
 class TestGenerateGroupId:
     """Test generate_group_id function."""
@@ -383,3 +403,18 @@ class TestGenerateGroupId:
         assert id1 == id2, (
             f"Expected deterministic IDs with mocked time/random, got {id1} != {id2}"
         )
+
+    def test_call_id_gives_stable_id_without_clock(self, monkeypatch):
+        """Test that a call_id derives the same id with no time/random reads."""
+
+        def fail(*args):
+            raise AssertionError("clock or RNG consulted")
+
+        monkeypatch.setattr(common_module.time, "time", fail)
+        monkeypatch.setattr(common_module.random, "randint", fail)
+        id1 = generate_group_id("edit_file", "/a.py", "call_1")
+
+        assert id1 == generate_group_id("edit_file", "/a.py", "call_1")
+        assert id1 != generate_group_id("edit_file", "/a.py", "call_2")
+        assert id1 != generate_group_id("edit_file", "/b.py", "call_1")
+        assert re.match(r"^edit_file_[a-f0-9]{8}$", id1)
@@ -2,14 +2,18 @@ import time
 from unittest.mock import patch
 
 import pytest
+from rich.text import Text
 
 from code_puppy.tools.common import (
     DIR_IGNORE_PATTERNS,
     FILE_IGNORE_PATTERNS,
     IGNORE_PATTERNS,
     _find_best_window,
+    _format_diff_with_syntax_highlighting,
     brighten_hex,
+    format_diff_with_colors,
     generate_group_id,
+    iter_diff_with_colors,
     should_ignore_dir_path,
     should_ignore_path,
 )
@@ -409,6 +413,44 @@ class TestCommonExtended:
         assert sum(1 for r in results if r) > 0  # Some should be True
         assert sum(1 for r in results if not r) > 0  # Some should be False
 
+    # ==================== Diff formatting Tests ====================
+
+    def test_iter_diff_with_colors_chunks_match_whole_diff(self):
+        """Test printing the chunks in turn reproduces the single formatted diff."""
+        body = "".join(f"+line {i}\n" for i in range(10))
+        diff_text = f"--- a/x.py\n+++ b/x.py\n@@ -0,0 +1,10 @@\n{body}"
+
+        chunks = list(iter_diff_with_colors(diff_text, chunk_lines=4))
+        whole = _format_diff_with_syntax_highlighting(diff_text, "#003300", "#330000")
+
+        assert len(chunks) == 4
+        assert "\n".join(chunk.plain for chunk in chunks) == whole.plain
+
+    def test_format_diff_with_colors_joins_the_chunks(self):
+        """Test the whole-diff formatter is the chunked one, joined."""
+        body = "".join(f"-old {i}\n+new {i}\n" for i in range(5))
+        diff_text = f"--- a/x.py\n+++ b/x.py\n@@ -1,5 +1,5 @@\n{body}"
+
+        chunks = list(iter_diff_with_colors(diff_text, chunk_lines=3))
+
+        assert format_diff_with_colors(diff_text) == Text("\n").join(chunks)
+
+    @pytest.mark.parametrize("pygments", [True, False])
+    def test_huge_diff_is_truncated_with_marker(self, pygments):
+        """Test diffs past the size cap stop early and say how much was left out."""
+        with (
+            patch("code_puppy.tools.common._MAX_DIFF_CHARS", 40),
+            patch("code_puppy.tools.common.PYGMENTS_AVAILABLE", pygments),
+        ):
+            diff_text = "".join(f"+line {i:02d}\n" for i in range(10))
+            text = _format_diff_with_syntax_highlighting(
+                diff_text, "#003300", "#330000"
+            )
+
+        assert "line 03" in text.plain
+        assert "line 04" not in text.plain
+        assert text.plain.endswith("… diff truncated, 6 more lines …")
+
 
 if __name__ == "__main__":
     pytest.main([__file__])